@@ -1,12 +1,50 @@
+from __future__ import annotations
 import os
-import time
-import requests
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from logging import Logger
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+
+_COPY_BUFSIZE = 1024 * 1024  # 1 MiB
+# Transient server errors the adapter retries; any other error status fails on the first response
+_RETRY_STATUSES = (500, 502, 503, 504)
+
+def _build_session(retries: int) -> requests.Session:
+    """
+    Build a keep-alive session whose adapter retries transient failures with exponential backoff.
+    `retries` is the total number of attempts per request, as in the original download loop.
+    """
+    # Deferred so importing the deployer does not pay for loading requests/urllib3
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=Retry(total=max(retries - 1, 0), backoff_factor=1, status_forcelist=_RETRY_STATUSES)
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _preallocate(fd: int, size: int) -> None:
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        pass  # preallocation is only an optimization
 
 def fetch_archive_and_manifest(archive_url: str, manifest_url: str, temp_dir: str, retries: int = 3, logger: Logger | None = None) -> tuple[str, str]:
     """
     Fetch the extensions archive (.zip) and its manifest (.json) from the specified source URL.
 
+    Both files are checked with HEAD requests, then downloaded concurrently over a single pooled
+    session; retries are handled by the session's adapter.
+
     Args:
         archive_url: Base URL where the archive is hosted (e.g., 'https://server.com/releases/extensions.zip')
         manifest_url: Base URL where the manifest is hosted (e.g., 'https://server.com/releases/manifest.json')
@@ -26,34 +64,60 @@ def fetch_archive_and_manifest(archive_url: str, manifest_url: str, temp_dir: st
             def warning(self, *args, **kwargs): pass
             def error(self, *args, **kwargs): pass
         logger = NullLogger()
-    
+
     os.makedirs(temp_dir, exist_ok=True)
     archive_path = os.path.join(temp_dir, "extensions.zip")
     manifest_path = os.path.join(temp_dir, "manifest.json")
 
-    def _download(url: str, dest: str):
-        for attempt in range(1, retries + 1):
-            try:
-                logger.info(f"Attempt {attempt}: Fetching {url}")
-                response = requests.get(url, stream=True, timeout=10)
+    def _preflight(session: requests.Session, url: str) -> int | None:
+        from requests.exceptions import RetryError
+        try:
+            response = session.head(url, timeout=5, allow_redirects=True)
+        except RetryError as e:
+            # HEAD kept answering with a transient 5xx; the GET gets its own retries
+            logger.debug("HEAD %s gave up (%s); leaving it to the download", url, e)
+            return None
+        except Exception as e:
+            logger.error("Failed to reach %s: %s", url, e)
+            raise Exception(f"Failed to reach {url}.") from e
+        if response.status_code in (404, 410):
+            logger.error("%s is not available (HTTP %s).", url, response.status_code)
+            raise Exception(f"{url} is not available (HTTP {response.status_code}).")
+        if not response.ok:
+            # Plenty of servers (and signed-URL CDNs) reject or mishandle HEAD while GET works;
+            # only a definite "gone" is trusted, anything else is left for the download to decide
+            logger.debug("HEAD %s returned HTTP %s; leaving it to the download", url, response.status_code)
+            return None
+        length = response.headers.get("Content-Length", "")
+        return int(length) if length.isdigit() else None
+
+    def _download(session: requests.Session, url: str, dest: str, size: int | None):
+        try:
+            logger.info("Fetching %s", url)
+            with session.get(url, stream=True, timeout=(5, 30)) as response:
                 response.raise_for_status()
+                response.raw.decode_content = True
+                with open(dest, "wb", buffering=0) as f:
+                    if size:
+                        _preallocate(f.fileno(), size)
+                    shutil.copyfileobj(response.raw, f, length=_COPY_BUFSIZE)
+                    f.truncate(f.tell())
+            logger.info("Successfully downloaded %s", os.path.basename(dest))
+        except Exception as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status is not None and status not in _RETRY_STATUSES:
+                # A 404 and the like are answered on the first attempt and never retried
+                logger.error("Failed to download %s: HTTP %d", url, status)
+                raise Exception(f"Failed to download {url} (HTTP {status}).") from e
+            logger.error("Failed to download %s after %d attempts: %s", url, retries, e)
+            raise Exception(f"Failed to download {url} after {retries} attempts.") from e
 
-                with open(dest, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                logger.info(f"Successfully downloaded {os.path.basename(dest)}")
-                return
-            except Exception as e:
-                logger.warning(f"Error fetching {url}: {e}")
-                if attempt < retries:
-                    wait_time = 2 ** attempt
-                    logger.debug(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Failed to download {url} after {retries} attempts.")
-                    raise Exception(f"Failed to download {url} after {retries} attempts.") from e
-
-    _download(archive_url, archive_path)
-    _download(manifest_url, manifest_path)
+    with _build_session(retries) as session, ThreadPoolExecutor(max_workers=2) as executor:
+        # Check both files concurrently first so a missing manifest fails before the archive transfer
+        archive_size, manifest_size = executor.map(lambda url: _preflight(session, url), (archive_url, manifest_url))
+        archive_future = executor.submit(_download, session, archive_url, archive_path, archive_size)
+        manifest_future = executor.submit(_download, session, manifest_url, manifest_path, manifest_size)
+        archive_future.result()
+        manifest_future.result()
 
     return archive_path, manifest_path
@@ -1,19 +1,31 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
 import shutil
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from logging import Logger
+from tempfile import mkdtemp
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib parser
+    orjson = None
 
 MANIFEST_FILENAME = "manifest.json"
+_NULL_LOGGER = logging.getLogger(__name__ + ".null")
+_NULL_LOGGER.addHandler(logging.NullHandler())
+_NULL_LOGGER.propagate = False
 _VERSION_TOKEN = re.compile(r"^(latest|v?\d[\w.\-]*)$", re.IGNORECASE)
 
 
 def apply_replace_mode(mode: str, backup_dir: str, temp_dir: str,
                        include_extensions: list[dict], exclude_extensions: list[dict],
-                       target_dir: str, logger: Logger | None = None) -> None:
+                       target_dir: str, logger: Logger | None = None) -> Path | None:
     """
     Apply the specified replace mode to handle existing extensions.
 
@@ -25,19 +37,18 @@ def apply_replace_mode(mode: str, backup_dir: str, temp_dir: str,
         exclude_extensions: List of extensions to exclude from deployment
         target_dir: Target VSCode extensions directory
 
+    Returns:
+        The backup session directory the removed extensions were moved to, or None
+        when nothing was removed.
+
     Replace modes:
     - 'NONE': Do not replace existing extensions
     - 'REPLACE': Replace existing extensions that are not the same version
     - 'CLEAN': Replace all existing extensions
     """
     if logger is None:
-        class NullLogger:
-            def debug(self, *args, **kwargs): pass
-            def info(self, *args, **kwargs): pass
-            def warning(self, *args, **kwargs): pass
-            def error(self, *args, **kwargs): pass
-        logger = NullLogger()
-    
+        logger = _NULL_LOGGER
+
     normalized = (mode or "NONE").upper()
     if normalized not in {"NONE", "REPLACE", "CLEAN"}:
         raise ValueError(f"Unsupported replace mode: {mode}")
@@ -55,43 +66,71 @@ def apply_replace_mode(mode: str, backup_dir: str, temp_dir: str,
 
     if normalized == "NONE":
         logger.debug("Replace mode NONE - skipping backup and cleanup.")
-        return
+        return None
 
     installed = _scan_extensions(target)
     if not installed:
-        logger.info(f"No extensions found in {target}; nothing to {normalized.lower()}.")
-        return
-
-    manifest = _load_manifest(temp / MANIFEST_FILENAME)
-    desired = _select_manifest_entries(manifest, include_extensions, exclude_extensions)
+        logger.info("No extensions found in %s; nothing to %s.", target, normalized.lower())
+        return None
 
-    victims = installed if normalized == "CLEAN" else _changed(installed, desired)
+    if normalized == "CLEAN":
+        # Everything goes, so the manifest is not needed (and may still be downloading)
+        victims = installed
+    else:
+        manifest = _load_manifest(temp / MANIFEST_FILENAME)
+        desired = _select_manifest_entries(manifest, include_extensions, exclude_extensions)
+        victims = _changed(installed, desired)
     if not victims:
         logger.info("All installed extensions already match desired versions.")
-        return
+        return None
+
+    return _backup_and_remove(victims, backup, normalized, logger)
 
-    _backup_and_remove(victims, backup, normalized, logger)
+
+def restore_backup(session_dir: Path, target_dir: str, logger: Logger | None = None) -> None:
+    """
+    Move everything in a backup session directory back into the target directory.
+
+    Used to undo a replace that ran ahead of a stage which later failed.
+    """
+    if logger is None:
+        logger = _NULL_LOGGER
+
+    target = Path(target_dir).expanduser().resolve()
+    with os.scandir(session_dir) as it:
+        entries = [{"path": Path(entry.path)} for entry in it]
+    if entries:
+        same_device = os.stat(session_dir).st_dev == os.stat(target).st_dev
+        for ext in entries:
+            _move_one(ext, target, same_device, logger)
+    session_dir.rmdir()
+    logger.info("Restored %d item(s) from %s to %s.", len(entries), session_dir, target)
 
 
 def _scan_extensions(target: Path) -> list[dict]:
     extensions: list[dict] = []
-    for item in target.iterdir():
-        if item.name.startswith("."):
-            continue
-        if not (item.is_dir() or item.suffix.lower() == ".vsix"):
-            continue
-        ident, version = _split_name(item.name)
-        if not ident:
-            continue
-        extensions.append({"id": ident, "version": version, "path": item})
+    with os.scandir(target) as it:
+        for entry in it:
+            name = entry.name
+            if name.startswith("."):
+                continue
+            if not (entry.is_dir() or name.lower().endswith(".vsix")):
+                continue
+            ident, version = _split_name(name)
+            if not ident:
+                continue
+            extensions.append({"id": ident, "version": version, "path": Path(entry.path)})
     return extensions
 
 
 def _load_manifest(manifest_path: Path) -> list[dict]:
     if not manifest_path.exists():
         raise FileNotFoundError(f"Manifest file not found at {manifest_path}")
-    with manifest_path.open("r", encoding="utf-8") as fh:
-        data = json.load(fh)
+    if orjson is not None:
+        data = orjson.loads(manifest_path.read_bytes())
+    else:
+        with manifest_path.open("r", encoding="utf-8") as fh:
+            data = json.load(fh)
     picked: list[dict] = []
     for file_info in data.get("files", []):
         if file_info.get("present", True) is False:
@@ -112,80 +151,108 @@ def _select_manifest_entries(entries: list[dict],
     for entry in entries:
         name = entry["id"]
         version = entry["version"]
-        if exclude and any(_rule_matches(rule, name, version) for rule in exclude):
+        normalized = _normalize_version(version)
+        if exclude and _rules_match(exclude, name, normalized):
             continue
-        if include and not any(_rule_matches(rule, name, version) for rule in include):
+        if include and not _rules_match(include, name, normalized):
             continue
         selected[name] = version
     return selected if selected or not include else {}
 
 
-def _normalize_rules(rules: list[dict] | None) -> list[tuple[str, str | None]]:
-    normalized: list[tuple[str, str | None]] = []
+def _normalize_rules(rules: list[dict] | None) -> dict[str, set[str | None]]:
+    normalized: dict[str, set[str | None]] = {}
     for rule in rules or []:
         name = (rule.get("name") or "").strip().lower()
         if not name:
             continue
         version = _normalize_version(rule.get("version"))
-        normalized.append((name, version))
+        normalized.setdefault(name, set()).add(version)
     return normalized
 
 
 def _changed(installed: list[dict], desired: dict[str, str | None]) -> list[dict]:
-    victims: list[dict] = []
-    for ext in installed:
-        wanted = desired.get(ext["id"])
-        if wanted is None:
-            continue
-        if _same_version(wanted, ext["version"]):
-            continue
-        victims.append(ext)
-    return victims
+    # Installed versions come from _split_name and are already normalized, so only the
+    # desired side needs normalizing, once per entry.
+    wanted = {(name, _normalize_version(version)) for name, version in desired.items() if version is not None}
+    wanted_names = {name for name, _ in wanted}
+    return [ext for ext in installed
+            if ext["id"] in wanted_names and (ext["id"], ext["version"]) not in wanted]
 
 
-def _backup_and_remove(victims: list[dict], backup_root: Path, mode: str, logger: Logger | None = None) -> None:
+def _backup_and_remove(victims: list[dict], backup_root: Path, mode: str, logger: Logger = _NULL_LOGGER) -> Path:
     session = _create_session_dir(backup_root, mode, logger)
-    for ext in victims:
-        src = ext["path"]
-        dest = session / src.name
-        if src.is_dir():
-            shutil.copytree(src, dest)
-            shutil.rmtree(src)
-        else:
-            dest.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(src, dest)
-            src.unlink()
-        if logger:
-            logger.debug(f"Moved {src} -> {dest}")
-    if logger:
-        logger.info(f"Backed up and removed {len(victims)} item(s) in {mode} mode.")
-
-
-def _create_session_dir(base: Path, mode: str, logger: Logger | None = None) -> Path:
+    # Victims all live in the target directory; when it shares a filesystem with the
+    # backup session a rename moves each extension without copying any data.
+    same_device = os.stat(victims[0]["path"].parent).st_dev == os.stat(session).st_dev
+    workers = min(len(victims), (os.cpu_count() or 1) * 2)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda ext: _move_one(ext, session, same_device, logger), victims))
+    logger.info("Backed up and removed %d item(s) in %s mode.", len(victims), mode)
+    return session
+
+
+def _move_one(ext: dict, session: Path, same_device: bool, logger: Logger = _NULL_LOGGER) -> None:
+    src = ext["path"]
+    dest = session / src.name
+    if same_device:
+        os.replace(src, dest)
+    elif src.is_dir():
+        _copy_tree(src, dest)
+        shutil.rmtree(src)
+    else:
+        _copy_file(src, dest)
+        src.unlink()
+    logger.debug("Moved %s -> %s", src, dest)
+
+
+def _copy_tree(src: Path, dest: Path) -> None:
+    dest.mkdir()
+    with os.scandir(src) as it:
+        for entry in it:
+            if entry.is_dir():
+                _copy_tree(Path(entry.path), dest / entry.name)
+            else:
+                _copy_file(Path(entry.path), dest / entry.name)
+    shutil.copystat(src, dest)
+
+
+def _copy_file(src: Path, dest: Path) -> None:
+    # copy_file_range keeps the data in the kernel; fall back to shutil where it is unsupported.
+    try:
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            remaining = os.fstat(s.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                if not copied:
+                    break
+                remaining -= copied
+    except (AttributeError, OSError):
+        shutil.copyfile(src, dest)
+    shutil.copystat(src, dest)
+
+
+def _create_session_dir(base: Path, mode: str, logger: Logger = _NULL_LOGGER) -> Path:
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    session = base / f"{timestamp}_{mode.lower()}"
-    counter = 0
-    while session.exists():
-        counter += 1
-        session = base / f"{timestamp}_{mode.lower()}_{counter}"
-    session.mkdir(parents=True, exist_ok=False)
-    if logger:
-        logger.info(f"Created backup directory at {session}")
+    # mkdtemp creates a uniquely named directory atomically, so no exists() probing is needed
+    session = Path(mkdtemp(prefix=f"{timestamp}_{mode.lower()}_", dir=base))
+    logger.info("Created backup directory at %s", session)
     return session
 
 
 def _split_name(raw_name: str) -> tuple[str | None, str | None]:
     if not raw_name:
         return None, None
-    leaf = Path(raw_name).name
-    base = leaf[:-5] if leaf.lower().endswith(".vsix") else leaf
-    parts = base.split("-")
-    if len(parts) >= 2:
-        suffix = parts[-1]
-        if _VERSION_TOKEN.match(suffix):
-            ident = "-".join(parts[:-1]).lower()
-            return ident or None, suffix.lower()
-    return base.lower(), None
+    leaf = raw_name.rstrip("/\\").rsplit("/", 1)[-1].rsplit("\\", 1)[-1]
+    lowered = leaf.lower()
+    base = lowered[:-5] if lowered.endswith(".vsix") else lowered
+    cut = base.rfind("-")
+    if cut != -1:
+        suffix = base[cut + 1:]
+        # Cheap first-character check rejects most non-version tails before the regex runs.
+        if (suffix[:1].isdigit() or suffix[:1] in ("v", "l")) and _VERSION_TOKEN.match(suffix):
+            return base[:cut] or None, suffix
+    return base, None
 
 
 def _normalize_version(value: str | None) -> str | None:
@@ -195,24 +262,14 @@ def _normalize_version(value: str | None) -> str | None:
     return trimmed or None
 
 
-def _same_version(a: str | None, b: str | None) -> bool:
-    return _normalize_version(a) == _normalize_version(b)
-
-
-def _rule_matches(rule: tuple[str, str | None], name: str, version: str | None) -> bool:
-    rule_name, rule_version = rule
-    if name != rule_name:
+def _rules_match(rules: dict[str, set[str | None]], name: str, version: str | None) -> bool:
+    versions = rules.get(name)
+    if versions is None:
         return False
-    if rule_version is None:
-        return True
-    return _same_version(rule_version, version)
+    return None in versions or version in versions
 
 
 def _is_within(child: Path, parent: Path) -> bool:
-    try:
-        child.resolve().relative_to(parent.resolve())
-        return True
-    except ValueError:
-        return False
-
-
+    # Both paths are expected to be resolved by the caller.
+    c, p = str(child), str(parent)
+    return c == p or c.startswith(p.rstrip(os.sep) + os.sep)
@@ -1,7 +1,8 @@
 import argparse
-from . import orchestrator
+from functools import lru_cache
 
-def main() -> int:
+@lru_cache(maxsize=None)
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="everfox-deployer",
         description=(
@@ -12,7 +13,7 @@ def main() -> int:
         ),
         formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument(
-        "--config", type=str, default=None,
+        "--config", type=str, default=argparse.SUPPRESS,
         metavar="FILE",
         help=(
             "Loads a configuration file. Overlapping values in the specified configuration will override those in the "
@@ -20,19 +21,19 @@ def main() -> int:
             "configuration (for array and map values)."
         ))
     parser.add_argument(
-        "--archive-url", type=str, default=None,
+        "--archive-url", type=str, default=argparse.SUPPRESS,
         help="Sets the URL to download the extension archive from.")
     parser.add_argument(
-        "--manifest-url", type=str, default=None,
+        "--manifest-url", type=str, default=argparse.SUPPRESS,
         help="Sets the URL to download the extension manifest from.")
     parser.add_argument(
-        "--retries", type=int, default=None,
+        "--retries", type=int, default=argparse.SUPPRESS,
         help="Sets the number of times a failed archive or manifest download should be retried before failing.")
     parser.add_argument(
-        "--target-dir", type=str, default=None,
+        "--target-dir", type=str, default=argparse.SUPPRESS,
         help="Sets the VSCode extensions-directory to install extensions to.")
     parser.add_argument(
-        "--verify-integrity", type=str, default=None,
+        "--verify-integrity", type=str, default=argparse.SUPPRESS,
         choices=["NONE", "WARN", "ERROR"],
         help=(
             "Sets whether extensions contained in the archive should be verified against signatures provided by the "
@@ -42,22 +43,22 @@ def main() -> int:
             "    ERROR - Fail if files do not match"
         ))
     parser.add_argument(
-        "--dry-run", type=bool, default=None,
+        "--dry-run", action=argparse.BooleanOptionalAction, default=argparse.SUPPRESS,
         help=(
             "Downloads the archive and manifest, validates system setup, and verifies archived extensions (if "
             "enabled), but does not set up or modify the filesystem nor install extensions."
         ))
     parser.add_argument(
-        "--log-level", type=str, default=None, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        "--log-level", type=str, default=argparse.SUPPRESS, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
         help="Sets the level of detail of log messages.")
     parser.add_argument(
-        "--log-file", type=str, default=None,
+        "--log-file", type=str, default=argparse.SUPPRESS,
         help=(
             "Sets the file to output log messages to. This flag will override the location set in configuration files "
             "but logs may still be written to syslog and/or stdout."
         ))
     parser.add_argument(
-        "--include-extensions", type=str, nargs="+", default=None, metavar="EXTENSION",
+        "--include-extensions", type=str, nargs="+", default=argparse.SUPPRESS, metavar="EXTENSION",
         help=(
             "Includes extensions to be extracted from the archive (if present).\n"
             "Extra extensions are only extracted as long as this flag is supplied; this is not written to a "
@@ -70,7 +71,7 @@ def main() -> int:
             "    redhat.vscode-yaml@1.19.1"
         ))
     parser.add_argument(
-        "--exclude-extensions", type=str, nargs="+", default=None, metavar="EXTENSION",
+        "--exclude-extensions", type=str, nargs="+", default=argparse.SUPPRESS, metavar="EXTENSION",
         help=(
             "Excludes configured extensions from being extracted from the archive.\n"
             "Extensions are only excluded as long as this flag is supplied; this is not written to a "
@@ -78,16 +79,16 @@ def main() -> int:
             "Format matches that of --include-extensions."
         ))
     parser.add_argument(
-        "--backup-dir", type=str, default=None,
+        "--backup-dir", type=str, default=argparse.SUPPRESS,
         help="Sets the location to back up old extensions to.")
     parser.add_argument(
-        "--temp-dir", type=str, default=None,
+        "--temp-dir", type=str, default=argparse.SUPPRESS,
         help=(
             "Sets the temporary working directory for downloading the archive and manifest and extracting and "
             "verifying new extensions before installation."
         ))
     parser.add_argument(
-        "--replace-mode", type=str, default=None,
+        "--replace-mode", type=str, default=argparse.SUPPRESS,
         choices=["NONE", "REPLACE", "CLEAN"],
         help=(
             "Sets how existing extensions in the target installation directory are treated.\n"
@@ -98,28 +99,19 @@ def main() -> int:
     parser.add_argument(
         "--server-archive-url",
         type=str,
-        default=None,
+        default=argparse.SUPPRESS,
         help="URL or path to the VS Code server archive (vscode-server-linux-x64.tar.gz). If provided in YAML or CLI, the server will be automatically pre-seeded using the commit ID from the manifest."
     )
 
-    args = parser.parse_args()
+    return parser
+
+def main() -> int:
+    options = vars(_build_parser().parse_args())
+
+    # Imported after argument parsing so --help and usage errors skip loading requests/yaml
+    from . import orchestrator
 
-    return orchestrator.run(config_path=args.config,
-                            archive_url=args.archive_url,
-                            manifest_url=args.manifest_url,
-                            target_dir=args.target_dir,
-                            verify_integrity=args.verify_integrity,
-                            dry_run=args.dry_run,
-                            log_level=args.log_level,
-                            log_file=args.log_file,
-                            include_extensions=args.include_extensions,
-                            exclude_extensions=args.exclude_extensions,
-                            retries=args.retries,
-                            backup_dir=args.backup_dir,
-                            temp_dir=args.temp_dir,
-                            replace_mode=args.replace_mode,
-                            server_archive_url=args.server_archive_url,
-                            )
+    return orchestrator.run(config_path=options.pop("config", None), **options)
 
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -1,10 +1,56 @@
-import yaml
-import validators
+import json
 import os
 
+_CACHE_SUFFIX = '.cache'
+# Bumped whenever validation changes, so sidecars written by older rules are re-validated
+_CACHE_VERSION = 3
+_REPLACE_MODES = frozenset(('NONE', 'REPLACE', 'CLEAN'))
+_VERIFY_MODES = frozenset(('NONE', 'WARN', 'ERROR'))
+_LOG_LEVELS = frozenset(('DEBUG', 'INFO', 'WARNING', 'ERROR'))
+# Bundled example config, located from the package rather than the working directory
+_DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'examples', 'deployer.yaml')
+
+# In-process memo of validated configs: path -> (mtime_ns, size, config)
+_CONFIG_MEMO: dict[str, tuple[int, int, dict]] = {}
+
+def _read_config_cache(config_path: str, st: os.stat_result) -> dict | None:
+    """
+    Return the validated config stored in the sidecar cache if it matches the config file's mtime and size.
+    """
+    try:
+        with open(config_path + _CACHE_SUFFIX, 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if cached.get('version') != _CACHE_VERSION:
+        return None
+    if cached.get('mtime_ns') != st.st_mtime_ns or cached.get('size') != st.st_size:
+        return None
+    return cached.get('config')
+
+def _write_config_cache(config_path: str, st: os.stat_result, data: dict) -> None:
+    try:
+        payload = json.dumps({'version': _CACHE_VERSION, 'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'config': data})
+        with open(config_path + _CACHE_SUFFIX, 'w', encoding='utf-8') as file:
+            file.write(payload)
+    except (OSError, TypeError, ValueError):
+        pass  # the cache is best-effort; an unwritable directory just means re-parsing next time
+
+def _load_yaml(file):
+    # Imported on first use so code paths that never read a config skip loading PyYAML
+    import yaml
+    try:
+        from yaml import CSafeLoader as Loader
+    except ImportError:  # PyYAML built without libyaml
+        from yaml import SafeLoader as Loader
+    return yaml.load(file, Loader=Loader)
+
 def parse_config(path: str | None) -> dict:
     """
     Parse the configuration YAML file and return a structured config dictionary.
+    The validated result is cached in a '<path>.cache' JSON sidecar and reused while the file's mtime and
+    size are unchanged, and repeated calls in the same process skip even the sidecar read.
 
     Args:
         path: Path to the YAML configuration file, or None for default
@@ -16,6 +62,7 @@ def parse_config(path: str | None) -> dict:
                 'replace_mode': str,  # 'NONE', 'REPLACE', or 'CLEAN'
                 'backup_dir': str,
                 'temp_dir': str,
+                'parallel_stages': bool,  # Overlap CLEAN backups with the archive download
                 'include_extensions': list[dict],  # [{'name': str, 'version': str}, ...]
                 'exclude_extensions': list[dict]   # [{'name': str, 'version': str}, ...]
             },
@@ -23,7 +70,8 @@ def parse_config(path: str | None) -> dict:
                 'archive_url': str,
                 'manifest_url': str,
                 'retries': int,
-                'server_archive_url': str | None  # Optional, for preseed
+                'server_archive_url': str | None,  # Optional, for preseed
+                'parallel_segments': int  # Concurrent byte ranges for the server archive download
             },
             'deployment': {
                 'target_dir': str,
@@ -39,12 +87,18 @@ def parse_config(path: str | None) -> dict:
     Raises:
         ValueError: If configuration is invalid or missing required fields
     """
-    default_path = os.path.join(os.getcwd(), 'deployer', 'examples', 'deployer.yaml')
-    config_path = path or default_path
+    config_path = path or _DEFAULT_CONFIG_PATH
 
     try:
-        with open(config_path, 'r') as file:
-            data = yaml.safe_load(file) or {}
+        st = os.stat(config_path)
+        memo = _CONFIG_MEMO.get(config_path)
+        if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+            return memo[2]
+        if (cached := _read_config_cache(config_path, st)) is not None:
+            _CONFIG_MEMO[config_path] = (st.st_mtime_ns, st.st_size, cached)
+            return cached
+        with open(config_path, 'rb') as file:
+            data = _load_yaml(file) or {}
     except Exception as e:
         raise ValueError(f"Failed to load config: {e}")
 
@@ -57,13 +111,16 @@ def parse_config(path: str | None) -> dict:
     if 'replace_mode' not in plan:
         raise ValueError("Missing 'replace_mode' in plan")
     plan['replace_mode'] = plan['replace_mode'].upper()
-    if plan['replace_mode'] not in ['NONE', 'REPLACE', 'CLEAN']:
+    if plan['replace_mode'] not in _REPLACE_MODES:
         raise ValueError(f"Invalid replace_mode: {plan['replace_mode']}")
 
     if 'backup_dir' not in plan:
         raise ValueError("Missing 'backup_dir' in plan")
     if 'temp_dir' not in plan:
         raise ValueError("Missing 'temp_dir' in plan")
+    plan['parallel_stages'] = plan.get('parallel_stages', False)
+    if type(plan['parallel_stages']) is not bool:
+        raise ValueError(f"Invalid parallel_stages (expected true/false): {plan['parallel_stages']!r}")
 
     plan['include_extensions'] = plan.get('include_extensions', [])
     for ext in plan['include_extensions']:
@@ -90,6 +147,10 @@ def parse_config(path: str | None) -> dict:
 
     source['retries'] = source.get('retries', 3)
     source['server_archive_url'] = source.get('server_archive_url')  # Optional
+    source['parallel_segments'] = source.get('parallel_segments', 1)
+    # Exact type check: a quoted YAML "4" or a bool must not reach the segment arithmetic
+    if type(source['parallel_segments']) is not int or source['parallel_segments'] < 1:
+        raise ValueError(f"Invalid parallel_segments (expected a positive integer): {source['parallel_segments']!r}")
 
     deployment = data['deployment']
     if 'target_dir' not in deployment:
@@ -98,19 +159,21 @@ def parse_config(path: str | None) -> dict:
     if 'verify_integrity' not in deployment:
         raise ValueError("Missing 'verify_integrity' in deployment")
     deployment['verify_integrity'] = deployment['verify_integrity'].upper()
-    if deployment['verify_integrity'] not in ['NONE', 'WARN', 'ERROR']:
+    if deployment['verify_integrity'] not in _VERIFY_MODES:
         raise ValueError(f"Invalid verify_integrity: {deployment['verify_integrity']}")
 
     deployment['dry_run'] = deployment.get('dry_run', False)
 
     logging = data['logging']
     logging['level'] = logging.get('level', 'INFO').upper()
-    if logging['level'] not in ['DEBUG', 'INFO', 'WARNING', 'ERROR']:
+    if logging['level'] not in _LOG_LEVELS:
         raise ValueError(f"Invalid log level: {logging['level']}")
     logging['file'] = logging.get('file')
     logging['to_console'] = logging.get('to_console', True) #default state is console logging
     logging['to_syslog'] = logging.get('to_syslog', False)
 
+    _write_config_cache(config_path, st, data)
+    _CONFIG_MEMO[config_path] = (st.st_mtime_ns, st.st_size, data)
     return data
 
 def _parse_extension_string(extension_str: str) -> dict:
@@ -123,8 +186,31 @@ def _parse_extension_string(extension_str: str) -> dict:
     Returns:
         Dictionary with 'name' and 'version' fields
     """
-    parts = extension_str.rsplit('@', 1)
-    return {'name': parts[0], 'version': parts[1] if len(parts) > 1 else 'latest'}
+    name, sep, version = extension_str.rpartition('@')
+    if not sep:
+        return {'name': version, 'version': 'latest'}
+    return {'name': name, 'version': version}
+
+def _parse_extension_list(extension_strs: list[str]) -> list[dict]:
+    return [_parse_extension_string(ext) for ext in extension_strs]
+
+# Maps each CLI keyword to its (section, field, converter) location in the structured config.
+_CLI_FIELDS = {
+    "replace_mode": ("plan", "replace_mode", str.upper),
+    "backup_dir": ("plan", "backup_dir", None),
+    "temp_dir": ("plan", "temp_dir", None),
+    "include_extensions": ("plan", "include_extensions", _parse_extension_list),
+    "exclude_extensions": ("plan", "exclude_extensions", _parse_extension_list),
+    "archive_url": ("source", "archive_url", None),
+    "manifest_url": ("source", "manifest_url", None),
+    "retries": ("source", "retries", None),
+    "server_archive_url": ("source", "server_archive_url", None),
+    "target_dir": ("deployment", "target_dir", None),
+    "verify_integrity": ("deployment", "verify_integrity", str.upper),
+    "dry_run": ("deployment", "dry_run", None),
+    "log_level": ("logging", "level", str.upper),
+    "log_file": ("logging", "file", None),
+}
 
 def parse_cli_config(**kwargs) -> dict:
     """
@@ -162,56 +248,17 @@ def parse_cli_config(**kwargs) -> dict:
         }
     """
     config = {}
-
-    plan = {}
-    if (rm := kwargs.get("replace_mode")) is not None:
-        plan['replace_mode'] = rm.upper()
-    if (bd := kwargs.get("backup_dir")) is not None:
-        plan['backup_dir'] = bd
-    if (td := kwargs.get("temp_dir")) is not None:
-        plan['temp_dir'] = td
-    if (ie := kwargs.get("include_extensions")) is not None:
-        plan['include_extensions'] = [_parse_extension_string(ext) for ext in ie]
-    if (ee := kwargs.get("exclude_extensions")) is not None:
-        plan['exclude_extensions'] = [_parse_extension_string(ext) for ext in ee]
-    if plan:
-        config['plan'] = plan
-
-    source = {}
-    if (au := kwargs.get("archive_url")) is not None:
-        source['archive_url'] = au
-    if (mu := kwargs.get("manifest_url")) is not None:
-        source['manifest_url'] = mu
-    if (rt := kwargs.get("retries")) is not None:
-        source['retries'] = rt
-    if (sau := kwargs.get("server_archive_url")) is not None:
-        source['server_archive_url'] = sau
-    if source:
-        config['source'] = source
-
-    deployment = {}
-    if (tg := kwargs.get("target_dir")) is not None:
-        deployment['target_dir'] = tg
-    if (vi := kwargs.get("verify_integrity")) is not None:
-        deployment['verify_integrity'] = vi.upper()
-    if (dr := kwargs.get("dry_run")) is not None:
-        deployment['dry_run'] = dr
-    if deployment:
-        config['deployment'] = deployment
-
-    logging = {}
-    if (ll := kwargs.get("log_level")) is not None:
-        logging['level'] = ll.upper()
-    if (lf := kwargs.get("log_file")) is not None:
-        logging['file'] = lf
-    if logging:
-        config['logging'] = logging
-
+    for key, value in kwargs.items():
+        if value is None or key not in _CLI_FIELDS:
+            continue
+        section, field, convert = _CLI_FIELDS[key]
+        config.setdefault(section, {})[field] = convert(value) if convert else value
     return config
 
 def merge_configs(yaml_config: dict, cli_config: dict) -> dict:
     """
     Merge CLI configuration into YAML configuration, with CLI values taking precedence.
+    Each section is a new dict, so neither input is mutated.
     
     Args:
         yaml_config: Configuration from YAML file
@@ -220,7 +267,5 @@ def merge_configs(yaml_config: dict, cli_config: dict) -> dict:
     Returns:
         Merged configuration dictionary
     """
-    merged = yaml_config.copy()
-    for section, values in cli_config.items():
-        merged.setdefault(section, {}).update(values)
-    return merged
\ No newline at end of file
+    sections = yaml_config.keys() | cli_config.keys()
+    return {section: {**yaml_config.get(section, {}), **cli_config.get(section, {})} for section in sections}
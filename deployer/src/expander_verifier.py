@@ -2,21 +2,43 @@ from __future__ import annotations
 
 import hashlib
 import json
+import logging
 import zipfile
-import subprocess
 import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable, Iterator
 from logging import Logger
 
-_CHUNK_SIZE = 131072  # 128 KiB
-
-@dataclass(frozen=True)
+try:
+    import ijson
+except ImportError:  # optional; falls back to loading the whole manifest
+    ijson = None
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib parser
+    orjson = None
+
+_NULL_LOGGER = logging.getLogger(__name__ + ".null")
+_NULL_LOGGER.addHandler(logging.NullHandler())
+_NULL_LOGGER.propagate = False
+_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+_SMALL_MEMBER_SIZE = 4 * 1024 * 1024  # members below this are hashed from a single read
+_CODE_CLI_CACHE: dict[str | None, Path] = {}
+# Absolute paths, drive/stream separators and '..' segments, checked in one pass over a '/'-normalized name
+_UNSAFE_MEMBER = re.compile(r"(?P<absolute>^/)|(?P<colon>:)|(?P<parent>(?:^|/)\.\.(?:/|$))")
+
+@dataclass(frozen=True, slots=True)
 class ManifestEntry:
     member: str
     size: int | None
     sha256: str | None
+    crc32: int | None = None
 
     @classmethod
     def from_manifest(cls, idx: int, raw: dict) -> ManifestEntry | None:
@@ -24,38 +46,69 @@ class ManifestEntry:
             return None
 
         raw_name = raw.get("path") or raw.get("name")
-        if not isinstance(raw_name, str) or not raw_name.strip():
+        # Exact type checks: cheaper than isinstance per entry, and they reject bools passed as sizes
+        if type(raw_name) is not str or not raw_name.strip():
             raise ValueError(f"Manifest entry at index {idx} missing 'name'/'path'.")
 
         member = _ensure_safe_member(raw_name)
         size = raw.get("size")
         if size is not None:
-            if not isinstance(size, int) or size < 0:
+            if type(size) is not int or size < 0:
                 raise ValueError(f"{member}: Manifest size must be a non-negative integer.")
         sha = raw.get("sha256")
-        if sha is not None:
-            sha = sha.strip().lower() or None
-        return cls(member=member, size=size, sha256=sha)
-
-    def verify(self, zf: zipfile.ZipFile) -> Iterator[str]:
+        sha = (sha.strip().lower() or None) if type(sha) is str else None
+        crc = raw.get("crc32")
+        if crc is not None:
+            if type(crc) is not int or crc < 0:
+                raise ValueError(f"{member}: Manifest crc32 must be a non-negative integer.")
+        return cls(member=member, size=size, sha256=sha, crc32=crc)
+
+    def trusts_crc(self, info: zipfile.ZipInfo, mode: str) -> bool:
+        """
+        In WARN mode a manifest CRC-32 that matches the archive's central directory stands in for the
+        SHA-256 check; zipfile still validates the member data against that CRC as it is read.
+        ERROR mode always verifies SHA-256.
+        """
+        return mode != "ERROR" and self.crc32 is not None and info.CRC == self.crc32
+
+    def verify(self, zf: zipfile.ZipFile, mode: str) -> Iterator[str]:
         info = zf.getinfo(self.member)
+        if self.crc32 is not None and info.CRC != self.crc32:
+            actual = None
+        elif self.trusts_crc(info, mode):
+            try:
+                _drain_zip_member(zf, self.member)
+            except zipfile.BadZipFile as exc:
+                yield f"{self.member}: {exc}."
+                return
+            actual = None
+        else:
+            actual = _hash_zip_member(zf, self.member) if self.sha256 else None
+        yield from self.compare(info, actual, mode)
 
+    def compare(self, info: zipfile.ZipInfo, actual: str | None, mode: str) -> Iterator[str]:
         if self.size is not None and info.file_size != self.size:
             yield f"{self.member}: Size mismatch (expected {self.size}, got {info.file_size})."
 
+        if self.crc32 is not None and info.CRC != self.crc32:
+            yield f"{self.member}: CRC-32 mismatch (expected {self.crc32:08x}, got {info.CRC:08x})."
+            return
+        if self.trusts_crc(info, mode):
+            return
+
         if not self.sha256:
             yield f"{self.member}: Manifest missing SHA-256 hash for verification."
             return
 
-        actual = _hash_zip_member(zf, self.member)
         if actual != self.sha256:
             yield f"{self.member}: SHA-256 mismatch (expected {self.sha256}, got {actual})."
 
 
-def expand_and_verify(archive: str, manifest: str, target_dir: str,
+def expand_and_verify(archive: str | os.PathLike, manifest: str | os.PathLike, target_dir: str | os.PathLike,
                       verify_integrity: str, dry_run: bool, logger: Logger | None = None) -> None:
     """
     Expand the archive and verify extension integrity.
+    Paths are used as given (after ~ expansion); callers are expected to pass resolved paths.
 
     Args:
         archive: Path to the extensions archive file
@@ -70,17 +123,12 @@ def expand_and_verify(archive: str, manifest: str, target_dir: str,
     - 'WARN': Warn if integrity is not correct but continue
     """
     if logger is None:
-        class NullLogger:
-            def debug(self, *args, **kwargs): pass
-            def info(self, *args, **kwargs): pass
-            def warning(self, *args, **kwargs): pass
-            def error(self, *args, **kwargs): pass
-        logger = NullLogger()
+        logger = _NULL_LOGGER
     
-    mode = (verify_integrity or "NONE").upper()
-    archive_path = Path(archive).expanduser().resolve()
-    manifest_path = Path(manifest).expanduser().resolve()
-    target_path = Path(target_dir).expanduser().resolve()
+    mode = sys.intern((verify_integrity or "NONE").upper())
+    archive_path = Path(archive).expanduser()
+    manifest_path = Path(manifest).expanduser()
+    target_path = Path(target_dir).expanduser()
     should_extract = not bool(dry_run)
 
     if not archive_path.is_file():
@@ -96,34 +144,47 @@ def expand_and_verify(archive: str, manifest: str, target_dir: str,
     try:
         with zipfile.ZipFile(archive_path, "r") as zf:
             _ensure_members_present(zf, entries, archive_path)
-
-            if mode != "NONE":
-                findings = list(_verify_entries(zf, entries))
-                if findings:
-                    _handle_verification_findings(mode, findings, logger)
-                else:
-                    logger.info(f"Integrity check passed for {len(entries)} file(s).")
+            # Entries whose SHA-256 check is replaced by the CRC-32, so the summary does not overstate it
+            crc_only = sum(entry.trusts_crc(zf.NameToInfo[entry.member], mode) for entry in entries)
 
             if not should_extract:
+                if mode != "NONE":
+                    findings = _verify_entries(archive_path, entries, mode, logger)
+                    _report_findings(mode, findings, len(entries), crc_only, logger)
                 logger.info("Dry run enabled - skipping extraction after verification.")
                 return
 
             target_path.mkdir(parents=True, exist_ok=True)
-            zf.extractall(path=target_path, members=[entry.member for entry in entries])
-            logger.info(f"Extracted {len(entries)} file(s) into {target_path.resolve()}.")
+            if mode == "NONE":
+                zf.extractall(path=target_path, members=[entry.member for entry in entries])
+            else:
+                # Hash while extracting so every member is decompressed only once
+                _extract_verified(archive_path, entries, target_path, mode, crc_only, logger)
+            logger.info("Extracted %d file(s) into %s.", len(entries), target_path)
 
     except zipfile.BadZipFile as exc:
         raise ValueError(f"Archive at {archive_path} is not a valid ZIP file.") from exc
 
 
 def _read_manifest(path: Path) -> list[ManifestEntry]:
+    if ijson is not None:
+        # Stream 'files' one item at a time so each raw dict is released once its entry is built
+        with path.open("rb") as handle:
+            entries = _build_entries(ijson.items(handle, "files.item"))
+        if entries:
+            return entries
+        # Nothing came through the stream; load fully to tell an empty manifest from a malformed one
+
     with path.open("r", encoding="utf-8") as handle:
         data = json.load(handle)
 
     files = data.get("files")
     if not isinstance(files, list):
         raise ValueError("Manifest missing 'files' array or array is invalid.")
+    return _build_entries(files)
 
+
+def _build_entries(files: Iterable[dict]) -> list[ManifestEntry]:
     entries: list[ManifestEntry] = []
     for idx, raw in enumerate(files):
         entry = ManifestEntry.from_manifest(idx, raw)
@@ -135,7 +196,7 @@ def _read_manifest(path: Path) -> list[ManifestEntry]:
 def _ensure_members_present(zf: zipfile.ZipFile,
                             entries: Iterable[ManifestEntry],
                             archive_path: Path) -> None:
-    available = set(zf.namelist())
+    available = zf.NameToInfo  # name -> ZipInfo map zipfile already keeps
     missing = sorted(entry.member for entry in entries if entry.member not in available)
     if missing:
         raise FileNotFoundError(
@@ -143,33 +204,149 @@ def _ensure_members_present(zf: zipfile.ZipFile,
         )
 
 
-def _verify_entries(zf: zipfile.ZipFile, entries: Iterable[ManifestEntry]) -> Iterator[str]:
-    for entry in entries:
-        yield from entry.verify(zf)
+def _verify_entries(archive_path: Path, entries: list[ManifestEntry], mode: str, logger: Logger) -> list[str]:
+    stop = threading.Event()
+    results = _map_entries(
+        archive_path, entries,
+        lambda zf, entry: _surface_issues(list(entry.verify(zf, mode)), mode, stop, logger),
+        stop,
+    )
+    return [issue for issues in results if issues for issue in issues]
+
+
+def _surface_issues(issues: list[str], mode: str, stop: threading.Event, logger: Logger) -> list[str]:
+    """
+    Act on a member's findings as soon as they are known: ERROR stops the remaining workers,
+    WARN logs each issue right away instead of after the whole archive has been hashed.
+    """
+    if issues:
+        if mode == "ERROR":
+            stop.set()
+        else:
+            for issue in issues:
+                logger.warning("Integrity issue: %s", issue)
+    return issues
+
+
+def _extract_verified(archive_path: Path, entries: list[ManifestEntry], target_path: Path,
+                      mode: str, crc_only: int, logger: Logger) -> None:
+    """
+    Extract and hash every entry in a single pass. Members are staged as '.part' files and only
+    moved into place once verification has been handled, so ERROR mode leaves the target untouched.
+    """
+    stop = threading.Event()
+    # Everything this call creates, recorded as it is created so a failure anywhere can undo it;
+    # list.append is atomic, so the workers share these without a lock
+    staged_files: list[Path] = []
+    created_dirs: list[Path] = []
+
+    def _extract_one(zf: zipfile.ZipFile, entry: ManifestEntry) -> tuple[Path, Path, list[str]]:
+        try:
+            info = zf.getinfo(entry.member)
+            dest = target_path / entry.member
+            missing = [d for d in (dest.parent, *dest.parent.parents) if not d.exists()]
+            if missing:
+                created_dirs.extend(missing)
+                dest.parent.mkdir(parents=True, exist_ok=True)
+            staged = dest.with_name(dest.name + ".part")
+            digest = None if entry.trusts_crc(info, mode) else hashlib.sha256()
+            staged_files.append(staged)
+            with zf.open(info, "r") as src, open(staged, "wb") as dst:
+                while chunk := src.read(_CHUNK_SIZE):
+                    if digest:
+                        digest.update(chunk)
+                    dst.write(chunk)
+            issues = list(entry.compare(info, digest.hexdigest() if digest else None, mode))
+            return staged, dest, _surface_issues(issues, mode, stop, logger)
+        except BaseException:
+            stop.set()  # the extraction is abandoned; spare the other workers their remaining entries
+            raise
+
+    try:
+        # Entries skipped after an ERROR-mode stop come back as None
+        results = _map_entries(archive_path, entries, _extract_one, stop)
+        findings = [issue for result in results if result for issue in result[2]]
+        _report_findings(mode, findings, len(entries), crc_only, logger)
+    except BaseException:
+        for staged in staged_files:
+            staged.unlink(missing_ok=True)
+        # Deepest first, and only if still empty (another entry may have filled a shared parent)
+        for directory in sorted(set(created_dirs), key=lambda d: len(d.parts), reverse=True):
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
+        raise
+    for staged, dest, _ in results:
+        os.replace(staged, dest)
+
+
+def _map_entries(archive_path: Path, entries: list[ManifestEntry], func,
+                 stop: threading.Event | None = None) -> list:
+    """
+    Apply func(zf, entry) to every entry on a thread pool and return the results in manifest order.
+    Once stop is set, workers skip their remaining entries and those results are left as None.
+    """
+    workers = max(1, min(os.cpu_count() or 1, len(entries)))
+    results: list = [None] * len(entries)
+
+    # ZipFile handles are not safe to share across threads, so each worker opens its own
+    # and handles every workers-th entry.
+    def _run_slice(start: int) -> None:
+        with zipfile.ZipFile(archive_path, "r") as zf:
+            for idx in range(start, len(entries), workers):
+                if stop is not None and stop.is_set():
+                    return
+                results[idx] = func(zf, entries[idx])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_run_slice, range(workers)))
+    return results
+
+
+def _report_findings(mode: str, findings: list[str], count: int, crc_only: int, logger: Logger) -> None:
+    if not findings:
+        if crc_only == count:
+            logger.info("CRC-32 verified (SHA-256 skipped) for %d file(s).", count)
+        elif crc_only:
+            logger.info("Integrity check passed for %d file(s); %d of them CRC-32 verified (SHA-256 skipped).",
+                        count, crc_only)
+        else:
+            logger.info("Integrity check passed for %d file(s).", count)
+    elif mode == "ERROR":
+        _handle_verification_findings(mode, findings, logger)
+    else:
+        # Individual issues were already logged as they were found
+        logger.warning("Integrity verification found %d issue(s); continuing.", len(findings))
 
 
 def _hash_zip_member(zf: zipfile.ZipFile, member: str) -> str:
-    digest = hashlib.sha256()
+    if zf.getinfo(member).file_size < _SMALL_MEMBER_SIZE:
+        # One C-level decompress and hash, no streaming wrapper loop
+        return hashlib.sha256(zf.read(member)).hexdigest()
     with zf.open(member, "r") as source:
-        for chunk in iter(lambda: source.read(_CHUNK_SIZE), b""):
-            digest.update(chunk)
-    return digest.hexdigest()
+        return hashlib.file_digest(source, "sha256").hexdigest()
+
+
+def _drain_zip_member(zf: zipfile.ZipFile, member: str) -> None:
+    # Reading to EOF makes zipfile check the data against the stored CRC-32 (BadZipFile on mismatch)
+    with zf.open(member, "r") as source:
+        while source.read(_CHUNK_SIZE):
+            pass
 
 
 def _ensure_safe_member(value: str) -> str:
-    candidate = value.strip()
-    if not candidate:
+    normalized = value.strip().replace("\\", "/")
+    if not normalized:
         raise ValueError("Manifest entry has an empty path/name.")
-    if candidate.startswith(("/", "\\")):
-        raise ValueError(f"Manifest entry path must be relative: {value!r}")
-    if ":" in candidate:
-        raise ValueError(f"Manifest entry path contains invalid character ':' ({value!r}).")
-
-    normalized = candidate.replace("\\", "/")
-    parts = [part for part in normalized.split("/") if part]
-    if any(part == ".." for part in parts):
+    unsafe = _UNSAFE_MEMBER.search(normalized)
+    if unsafe:
+        if unsafe.lastgroup == "absolute":
+            raise ValueError(f"Manifest entry path must be relative: {value!r}")
+        if unsafe.lastgroup == "colon":
+            raise ValueError(f"Manifest entry path contains invalid character ':' ({value!r}).")
         raise ValueError(f"Manifest entry path escapes target directory: {value!r}")
-    return "/".join(parts)
+    return "/".join(part for part in normalized.split("/") if part)
 
 
 def _handle_verification_findings(mode: str, findings: Iterable[str], logger: Logger | None = None) -> None:
@@ -182,8 +359,9 @@ def _handle_verification_findings(mode: str, findings: Iterable[str], logger: Lo
         logger.warning(message)
 
 
-def install_extensions(manifest: str, target_dir: str, commit_id: str | None = None,
-                       dry_run: bool = False, logger: Logger | None = None) -> None:
+def install_extensions(manifest: str | os.PathLike, target_dir: str | os.PathLike, commit_id: str | None = None,
+                       dry_run: bool = False, logger: Logger | None = None,
+                       manifest_data: dict | None = None) -> None:
     """
     Install VSIX extensions using the VS Code server's code CLI.
     
@@ -193,14 +371,10 @@ def install_extensions(manifest: str, target_dir: str, commit_id: str | None = N
         commit_id: VS Code server commit ID (to locate the code CLI)
         dry_run: Whether to perform a dry run (no actual installation)
         logger: Logger instance
+        manifest_data: Already-parsed manifest contents; when given, the manifest file is not re-read
     """
     if logger is None:
-        class NullLogger:
-            def debug(self, *args, **kwargs): pass
-            def info(self, *args, **kwargs): pass
-            def warning(self, *args, **kwargs): pass
-            def error(self, *args, **kwargs): pass
-        logger = NullLogger()
+        logger = _NULL_LOGGER
     
     if dry_run:
         logger.info("Dry run enabled - skipping extension installation.")
@@ -214,17 +388,21 @@ def install_extensions(manifest: str, target_dir: str, commit_id: str | None = N
         return
     
     # Read manifest to get list of VSIX files
-    manifest_path = Path(manifest).expanduser().resolve()
-    if not manifest_path.is_file():
-        logger.warning(f"Manifest not found: {manifest_path}; skipping extension installation.")
-        return
-    
-    try:
-        with open(manifest_path, "r", encoding="utf-8") as f:
-            manifest_data = json.load(f)
-    except Exception as e:
-        logger.warning(f"Failed to read manifest: {e}; skipping extension installation.")
-        return
+    if manifest_data is None:
+        manifest_path = Path(manifest).expanduser()
+        if not manifest_path.is_file():
+            logger.warning("Manifest not found: %s; skipping extension installation.", manifest_path)
+            return
+        
+        try:
+            if orjson is not None:
+                manifest_data = orjson.loads(manifest_path.read_bytes())
+            else:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifest_data = json.load(f)
+        except Exception as e:
+            logger.warning("Failed to read manifest: %s; skipping extension installation.", e)
+            return
     
     files = manifest_data.get("files", [])
     vsix_files = []
@@ -239,47 +417,79 @@ def install_extensions(manifest: str, target_dir: str, commit_id: str | None = N
         logger.info("No VSIX files found in manifest; nothing to install.")
         return
     
-    target_path = Path(target_dir).expanduser().resolve()
+    target_path = Path(target_dir).expanduser()
     installed_count = 0
     failed_count = 0
     
+    vsix_paths = []
     for vsix_file in vsix_files:
         vsix_path = target_path / vsix_file
         if not vsix_path.exists():
-            logger.warning(f"VSIX file not found: {vsix_path}; skipping.")
+            logger.warning("VSIX file not found: %s; skipping.", vsix_path)
             failed_count += 1
             continue
-        
-        try:
-            logger.info(f"Installing extension: {vsix_path.name}")
-            result = subprocess.run(
-                [str(code_cli_path), "--install-extension", str(vsix_path)],
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout per extension
-            )
-            
-            if result.returncode == 0:
-                logger.info(f"✅ Successfully installed: {vsix_path.name}")
-                installed_count += 1
-                # Optionally remove the VSIX file after successful installation
-                # vsix_path.unlink()
-            else:
-                logger.warning(f"❌ Failed to install {vsix_path.name}: {result.stderr}")
-                failed_count += 1
-        except subprocess.TimeoutExpired:
-            logger.error(f"Timeout installing {vsix_path.name}")
-            failed_count += 1
-        except Exception as e:
-            logger.error(f"Error installing {vsix_path.name}: {e}")
+        vsix_paths.append(vsix_path)
+
+    # Install everything in one CLI invocation so server startup is paid once; if that fails,
+    # retry each VSIX on its own to find out which ones are at fault. Invocations are kept
+    # strictly sequential: concurrent CLIs writing the same extensions directory race on its
+    # shared extensions.json registry.
+    if len(vsix_paths) > 1:
+        logger.info("Installing %d extension(s) in one batch", len(vsix_paths))
+        if _run_code_cli(code_cli_path, vsix_paths, logger) is None:
+            for vsix_path in vsix_paths:
+                logger.info("✅ Successfully installed: %s", vsix_path.name)
+            installed_count += len(vsix_paths)
+            vsix_paths = []
+        else:
+            logger.warning("Batch installation failed; installing extensions individually.")
+
+    for vsix_path in vsix_paths:
+        logger.info("Installing extension: %s", vsix_path.name)
+        error = _run_code_cli(code_cli_path, [vsix_path], logger)
+        if error is None:
+            logger.info("✅ Successfully installed: %s", vsix_path.name)
+            installed_count += 1
+            # Optionally remove the VSIX file after successful installation
+            # vsix_path.unlink()
+        else:
+            logger.warning("❌ Failed to install %s: %s", vsix_path.name, error)
             failed_count += 1
     
-    logger.info(f"Extension installation complete: {installed_count} installed, {failed_count} failed")
+    logger.info("Extension installation complete: %d installed, %d failed", installed_count, failed_count)
+
+
+def _run_code_cli(code_cli_path: Path, vsix_paths: list[Path], logger: Logger) -> str | None:
+    """
+    Run the code CLI with one --install-extension flag per VSIX. Returns None on success or an error description.
+    """
+    import subprocess  # only needed once extensions are actually installed
+
+    args = [str(code_cli_path)]
+    for vsix_path in vsix_paths:
+        args += ["--install-extension", str(vsix_path)]
+    try:
+        result = subprocess.run(
+            args,
+            capture_output=True,
+            text=True,
+            timeout=300 * len(vsix_paths)  # 5 minute timeout per extension
+        )
+    except subprocess.TimeoutExpired:
+        logger.error("Timeout installing %s", ", ".join(p.name for p in vsix_paths))
+        return "timed out"
+    except Exception as e:
+        logger.error("Error installing %s: %s", ", ".join(p.name for p in vsix_paths), e)
+        return str(e)
+    if result.returncode != 0:
+        return result.stderr
+    return None
 
 
 def _find_code_cli(commit_id: str | None = None, logger: Logger | None = None) -> Path | None:
     """
     Find the VS Code server's code CLI executable.
+    Successful lookups are memoized per commit ID for the life of the process.
     
     Args:
         commit_id: VS Code server commit ID (optional, will try to find any installed server)
@@ -289,19 +499,26 @@ def _find_code_cli(commit_id: str | None = None, logger: Logger | None = None) -
         Path to the code CLI executable, or None if not found
     """
     if logger is None:
-        class NullLogger:
-            def debug(self, *args, **kwargs): pass
-            def info(self, *args, **kwargs): pass
-            def warning(self, *args, **kwargs): pass
-            def error(self, *args, **kwargs): pass
-        logger = NullLogger()
-    
-    home = Path.home()
-    vscode_server_bin = home / ".vscode-server" / "bin"
-    
-    if not vscode_server_bin.exists():
-        logger.debug(f"VS Code server bin directory not found: {vscode_server_bin}")
+        logger = _NULL_LOGGER
+
+    code_cli = _CODE_CLI_CACHE.get(commit_id)
+    if code_cli is not None:
+        logger.debug("Using cached code CLI at: %s", code_cli)
+        return code_cli
+
+    code_cli = _locate_code_cli(commit_id)
+    if code_cli is None:
+        logger.debug("Could not find code CLI in any VS Code server installation")
         return None
+
+    # Only hits are cached so a server pre-seeded later in the process is still found
+    _CODE_CLI_CACHE[commit_id] = code_cli
+    logger.debug("Found code CLI at: %s", code_cli)
+    return code_cli
+
+
+def _locate_code_cli(commit_id: str | None) -> Path | None:
+    vscode_server_bin = Path.home() / ".vscode-server" / "bin"
     
     # Possible locations for the code CLI
     possible_paths = [
@@ -311,25 +528,23 @@ def _find_code_cli(commit_id: str | None = None, logger: Logger | None = None) -
     ]
     
     # If commit_id is provided, try that specific commit first
+    # (os.access fails for missing paths too, so no separate exists() probe is needed)
     if commit_id:
-        server_dir = vscode_server_bin / commit_id
-        if server_dir.exists():
-            for rel_path in possible_paths:
-                code_cli = server_dir / rel_path
-                if code_cli.exists() and os.access(code_cli, os.X_OK):
-                    logger.debug(f"Found code CLI at: {code_cli}")
-                    return code_cli
+        for rel_path in possible_paths:
+            code_cli = vscode_server_bin / commit_id / rel_path
+            if os.access(code_cli, os.X_OK):
+                return code_cli
     
     # Otherwise, try to find any installed server
-    for commit_dir in sorted(vscode_server_bin.iterdir(), reverse=True):  # Try newest first
-        if not commit_dir.is_dir():
-            continue
+    try:
+        with os.scandir(vscode_server_bin) as it:
+            commit_dirs = sorted((entry.path for entry in it if entry.is_dir()), reverse=True)  # Try newest first
+    except FileNotFoundError:
+        return None
+    for commit_dir in commit_dirs:
         for rel_path in possible_paths:
-            code_cli = commit_dir / rel_path
-            if code_cli.exists() and os.access(code_cli, os.X_OK):
-                logger.debug(f"Found code CLI at: {code_cli}")
+            code_cli = Path(commit_dir, rel_path)
+            if os.access(code_cli, os.X_OK):
                 return code_cli
     
-    logger.debug("Could not find code CLI in any VS Code server installation")
     return None
-
@@ -1,59 +1,119 @@
 from __future__ import annotations
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib parser
+    orjson = None
+
 from .config_parser import parse_config, parse_cli_config, merge_configs
 from .logger import get_logger, LogConfig
 from .path_guard import ensure_paths
 from .archive_downloader import fetch_archive_and_manifest
-from .backup_cleanup import apply_replace_mode
+from .backup_cleanup import apply_replace_mode, restore_backup
 from .expander_verifier import expand_and_verify, install_extensions
 from .remote_server import preseed_server, validate_commit_tree, download_server_archive
 
+# CLI options -> (YAML config it was merged with, merged config), for repeated run() calls in one process
+_MERGED_CONFIGS: dict[tuple, tuple[dict, dict]] = {}
+
+def _merged_config(yaml_config: dict, kwargs: dict) -> dict:
+    # parse_config hands back the same dict while the file is unchanged, so identity means "same YAML";
+    # the entry keeps that dict alive, so its identity cannot be reused by another object
+    key = tuple(sorted((name, repr(value)) for name, value in kwargs.items()))
+    cached = _MERGED_CONFIGS.get(key)
+    if cached and cached[0] is yaml_config:
+        return cached[1]
+    config = merge_configs(yaml_config, parse_cli_config(**kwargs))
+    _MERGED_CONFIGS[key] = (yaml_config, config)
+    return config
+
 def run(config_path: str | None = None, **kwargs) -> int:
     """
     Main orchestrator function that coordinates the deployment process.
     """
-    # 1-3) Parse + merge configs
-    yaml_config = parse_config(config_path)
-    cli_config = parse_cli_config(**kwargs)
-    config = merge_configs(yaml_config, cli_config)
-
-    # Ensure required paths exist and are writable (uses Max's PathGuard)
-    ensure_paths(
-        config["plan"]["backup_dir"],
-        config["plan"]["temp_dir"],
-        config["deployment"]["target_dir"],
-        config["logging"]["file"]
-    )
+    # 1-3) Parse + merge configs; sections are bound once and reused by every stage below
+    config = _merged_config(parse_config(config_path), kwargs)
+    plan = config["plan"]
+    source = config["source"]
+    deployment = config["deployment"]
+    log_cfg = config["logging"]
+
+    # Ensure required paths exist and are writable (uses Max's PathGuard); the resolved paths it
+    # returns are reused below instead of re-resolving the config strings in every stage
+    paths = ensure_paths(
+        plan["backup_dir"],
+        plan["temp_dir"],
+        deployment["target_dir"],
+        log_cfg["file"]
+    ).paths
 
     # Logger (uses Max's logger)
     logger = get_logger(LogConfig(
         name="deployer",
-        level=config["logging"]["level"],
-        log_file=config["logging"]["file"],
-        to_console=config["logging"].get("to_console", True),
-        to_syslog=config["logging"].get("to_syslog", False)
+        level=log_cfg["level"],
+        log_file=log_cfg["file"],
+        to_console=log_cfg.get("to_console", True),
+        to_syslog=log_cfg.get("to_syslog", False)
     ))
 
-    # 4) Fetch archive + manifest to temp dir
-    archive_path, manifest_path = fetch_archive_and_manifest(
-        config["source"]["archive_url"],
-        config["source"]["manifest_url"],
-        config["plan"]["temp_dir"],
-        config["source"]["retries"],
-        logger
-    )
+    def _apply_replace() -> Path | None:
+        return apply_replace_mode(
+            plan["replace_mode"],
+            plan["backup_dir"],
+            plan["temp_dir"],
+            plan["include_extensions"],
+            plan["exclude_extensions"],
+            deployment["target_dir"],
+            logger
+        )
+
+    # 4) Fetch archive + manifest to temp dir. A CLEAN backup only touches target_dir/backup_dir, so
+    # with plan.parallel_stages it runs while the download is in flight; REPLACE needs the manifest.
+    # The removal then lands before the fetch and preseed have succeeded, so any failure up to
+    # step 5 moves the backed-up extensions back into target_dir.
+    overlap_replace = plan.get("parallel_stages", False) and plan["replace_mode"] == "CLEAN"
+    replace_session = None
+    committed = False
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            replace_future = executor.submit(_apply_replace) if overlap_replace else None
+            try:
+                archive_path, manifest_path = map(Path, fetch_archive_and_manifest(
+                    source["archive_url"],
+                    source["manifest_url"],
+                    str(paths.temp_dir),
+                    source["retries"],
+                    logger
+                ))
+            finally:
+                # Collected even when the fetch raised, so the finally below can restore it
+                if replace_future:
+                    replace_session = replace_future.result()
 
-    # --- Optional offline Remote-SSH preseed (automatic if server_archive_url is present) ---
-    server_archive_url = config["source"].get("server_archive_url")
-    if server_archive_url:
-        # Read commit ID from manifest
+        # Read the manifest once; preseed and extension installation both use it
+        manifest_error = None
         try:
-            with open(manifest_path, "r", encoding="utf-8") as f:
-                manifest_data = json.load(f)
-            commit = manifest_data.get("vscode_commit_id")
-            
+            if orjson is not None:
+                manifest_data = orjson.loads(manifest_path.read_bytes())
+            else:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifest_data = json.load(f)
+            commit_id = manifest_data.get("vscode_commit_id")
+        except Exception as e:
+            manifest_data = commit_id = None
+            manifest_error = e
+
+        # --- Optional offline Remote-SSH preseed (automatic if server_archive_url is present) ---
+        server_archive_url = source.get("server_archive_url")
+        if server_archive_url:
+            if manifest_error is not None:
+                logger.error("Failed to read manifest to get commit ID: %s", manifest_error)
+                return 1
+            commit = commit_id
+
             if not commit:
                 logger.warning("server_archive_url is present but manifest does not contain vscode_commit_id; skipping preseed")
             else:
@@ -65,9 +125,10 @@ def run(config_path: str | None = None, **kwargs) -> int:
                         logger.info("Downloading server archive from %s", server_archive_url)
                         server_tarball_path = download_server_archive(
                             server_archive_url,
-                            Path(config["plan"]["temp_dir"]),
-                            config["source"]["retries"],
-                            logger
+                            paths.temp_dir,
+                            source["retries"],
+                            logger,
+                            segments=source.get("parallel_segments", 1)
                         )
                     else:
                         # Use local path directly
@@ -76,55 +137,50 @@ def run(config_path: str | None = None, **kwargs) -> int:
                             logger.error("Server archive path does not exist: %s", server_tarball_path)
                             return 1
                         logger.info("Using local server archive at %s", server_tarball_path)
-                    
-                    target = preseed_server(commit, server_tarball_path)
+                
+                    # ERROR mode also checks the tarball against the manifest's server_sha256
+                    expected_sha256 = None
+                    if deployment["verify_integrity"] == "ERROR":
+                        expected_sha256 = manifest_data.get("server_sha256")
+                    target = preseed_server(commit, server_tarball_path, expected_sha256=expected_sha256)
                     validate_commit_tree(target)
                     logger.info("Pre-seeded VS Code server at %s", target)
                 except Exception as e:
                     logger.error("Preseed failed for commit %s: %s", commit, e)
                     return 1
-        except Exception as e:
-            logger.error("Failed to read manifest to get commit ID: %s", e)
-            return 1
-    # -------------------------------------------------------------
+        # -------------------------------------------------------------
+        committed = True
+    finally:
+        if replace_session is not None and not committed:
+            logger.warning("Fetch or preseed failed after the CLEAN backup; restoring %s", replace_session)
+            restore_backup(replace_session, deployment["target_dir"], logger)
 
     # 5) Apply replace/backup strategy
-    apply_replace_mode(
-        config["plan"]["replace_mode"],
-        config["plan"]["backup_dir"],
-        config["plan"]["temp_dir"],
-        config["plan"]["include_extensions"],
-        config["plan"]["exclude_extensions"],
-        config["deployment"]["target_dir"],
-        logger
-    )
+    if not overlap_replace:
+        _apply_replace()
 
     # 6-7) Expand & verify (extensions)
     expand_and_verify(
         archive_path,
         manifest_path,
-        config["deployment"]["target_dir"],
-        config["deployment"]["verify_integrity"],
-        config["deployment"]["dry_run"],
+        paths.target_dir,
+        deployment["verify_integrity"],
+        deployment["dry_run"],
         logger
     )
 
     # 8) Install extensions using VS Code server's code CLI
-    # Get commit ID from manifest for locating the code CLI
-    commit_id = None
-    try:
-        with open(manifest_path, "r", encoding="utf-8") as f:
-            manifest_data = json.load(f)
-        commit_id = manifest_data.get("vscode_commit_id")
-    except Exception as e:
-        logger.debug(f"Could not read commit ID from manifest: {e}")
+    # The commit ID from the manifest is used to locate the code CLI
+    if manifest_error is not None:
+        logger.debug("Could not read commit ID from manifest: %s", manifest_error)
     
     install_extensions(
         manifest_path,
-        config["deployment"]["target_dir"],
+        paths.target_dir,
         commit_id,
-        config["deployment"]["dry_run"],
-        logger
+        deployment["dry_run"],
+        logger,
+        manifest_data=manifest_data
     )
 
     return 0
@@ -1,19 +1,22 @@
 from __future__ import annotations
-import os, shutil
+import os, shutil, stat
 from dataclasses import dataclass
 from pathlib import Path
 
+# Directories already checked as writable by this process
+_checked: set[Path] = set()
+
 class PathGuardError(RuntimeError):
     pass
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Paths:
     backup_dir: Path
     temp_dir: Path
     target_dir: Path
     log_file: Path | None = None
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GuardResult:
     paths: Paths
     warnings: tuple[str, ...] = ()
@@ -22,15 +25,34 @@ def _must_abs(p: Path, label: str):
     if not p.is_absolute():
         raise PathGuardError(f"{label} must be an absolute path: {p}")
 
-def _writable_dir(p: Path):
-    p.mkdir(parents=True, exist_ok=True)
-    if not p.is_dir():
+def _writable_dir(p: Path, strict: bool = False):
+    try:
+        st = os.stat(p)
+    except FileNotFoundError:
+        st = None
+    if st is None:
+        try:
+            p.mkdir(parents=True, exist_ok=True)
+        except FileExistsError:
+            raise PathGuardError(f"Not a directory: {p}") from None
+    elif not stat.S_ISDIR(st.st_mode):
         raise PathGuardError(f"Not a directory: {p}")
-    test = p / ".wcheck"
-    test.write_text("ok")
-    test.unlink(missing_ok=True)
+    # The directory is (re)created above on every call, since a cleanup stage may have removed it;
+    # only the writability check is skipped for directories this process already proved
+    if p in _checked and not strict:
+        return
+    # One faccessat(2) instead of a probe file; it honours read-only mounts, but some network
+    # filesystems enforce rules it cannot see, so strict callers still write a probe file
+    if not os.access(p, os.W_OK | os.X_OK):
+        raise PathGuardError(f"Directory is not writable: {p}")
+    if strict:
+        test = p / ".wcheck"
+        test.write_text("ok")
+        test.unlink(missing_ok=True)
+    _checked.add(p)
 
-def ensure_paths(backup_dir: str, temp_dir: str, target_dir: str, log_file: str | None = None) -> GuardResult:
+def ensure_paths(backup_dir: str, temp_dir: str, target_dir: str, log_file: str | None = None,
+                 strict: bool = False, check_disk: bool = True) -> GuardResult:
     backup = Path(backup_dir).expanduser().resolve()
     temp = Path(temp_dir).expanduser().resolve()
     target = Path(target_dir).expanduser().resolve()
@@ -41,17 +63,19 @@ def ensure_paths(backup_dir: str, temp_dir: str, target_dir: str, log_file: str
     _must_abs(target, "target_dir")
     if logf: _must_abs(logf, "log_file")
 
-    _writable_dir(backup)
-    _writable_dir(temp)
-    _writable_dir(target)
-    if logf: _writable_dir(logf.parent)
+    _writable_dir(backup, strict)
+    _writable_dir(temp, strict)
+    _writable_dir(target, strict)
+    if logf: _writable_dir(logf.parent, strict)
 
     warns = []
-    try:
-        free = shutil.disk_usage(backup).free
-        if free < 100 * 1024 * 1024:
-            warns.append(f"Low free space under {backup}: {free} bytes")
-    except Exception:
-        pass
+    # statvfs() can block for a long time on NFS/FUSE mounts, so callers may skip the low-space check
+    if check_disk:
+        try:
+            free = shutil.disk_usage(backup).free
+            if free < 100 * 1024 * 1024:
+                warns.append(f"Low free space under {backup}: {free} bytes")
+        except Exception:
+            pass
 
     return GuardResult(Paths(backup, temp, target, logf), tuple(warns))
@@ -1,22 +1,10 @@
 import argparse
+import sys
+from functools import lru_cache
 from . import orchestrator
 
-def _parse_bool(value: str) -> bool:
-    """
-    Parse a string value into a boolean.
-    Accepts: true, false, yes, no, 1, 0 (case-insensitive)
-    """
-    if isinstance(value, bool):
-        return value
-    if isinstance(value, str):
-        value_lower = value.lower()
-        if value_lower in ('true', 'yes', '1', 'on'):
-            return True
-        if value_lower in ('false', 'no', '0', 'off'):
-            return False
-    raise argparse.ArgumentTypeError(f"Invalid boolean value: {value}")
-
-def main() -> int:
+@lru_cache(maxsize=None)
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="everfox-downloader",
         description=(
@@ -65,8 +53,8 @@ def main() -> int:
         "--retries", type=int, default=None,
         help="Sets the number of times a failed extension download should be retried before skipping it.")
     parser.add_argument(
-        "--skip-failed", type=_parse_bool, default=None,
-        help="Sets whether to skip failed downloads or exit on failure.")
+        "--skip-failed", action=argparse.BooleanOptionalAction, default=None,
+        help="Sets whether to skip failed downloads (--skip-failed) or exit on failure (--no-skip-failed).")
     parser.add_argument(
         "--log-level", type=str, default=None, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
         help="Sets the level of detail of log messages.")
@@ -76,7 +64,17 @@ def main() -> int:
             "Sets the file to output log messages to. This flag will override the location set in configuration files "
             "but logs may still be written to syslog and/or stdout."
         ))
-    args = parser.parse_args()
+
+    return parser
+
+def main() -> int:
+    # The common invocations (no flags, or just --config FILE) need no parser; every other option
+    # is unset, which parse_cli_config treats the same as the parser's None defaults
+    argv = sys.argv[1:]
+    if not argv or (len(argv) == 2 and argv[0] == "--config" and not argv[1].startswith("-")):
+        return orchestrator.run(config_path=argv[1] if argv else None)
+
+    args = _build_parser().parse_args()
 
     return orchestrator.run(config_path=args.config,
                             include_extensions=args.include_extensions,
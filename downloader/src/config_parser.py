@@ -1,9 +1,57 @@
-import yaml
+import copy
+import json
 import os
 
+_CACHE_SUFFIX = '.cache'
+# Bumped whenever validation changes, so sidecars written by older rules are re-validated
+_CACHE_VERSION = 1
+_LOG_LEVELS = frozenset(('DEBUG', 'INFO', 'WARNING', 'ERROR'))
+# Bundled example config, located from the package rather than the working directory
+_DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'examples', 'downloader.yaml')
+_REQUIRED_SECTIONS = ('extensions', 'output', 'download', 'logging')
+
+# In-process memo of validated configs: path -> (mtime_ns, size, config)
+_CONFIG_MEMO: dict[str, tuple[int, int, dict]] = {}
+
+def _read_config_cache(config_path: str, st: os.stat_result) -> dict | None:
+    """
+    Return the validated config stored in the sidecar cache if it matches the config file's mtime and size.
+    """
+    try:
+        with open(config_path + _CACHE_SUFFIX, 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if cached.get('version') != _CACHE_VERSION:
+        return None
+    if cached.get('mtime_ns') != st.st_mtime_ns or cached.get('size') != st.st_size:
+        return None
+    return cached.get('config')
+
+def _write_config_cache(config_path: str, st: os.stat_result, data: dict) -> None:
+    try:
+        payload = json.dumps({'version': _CACHE_VERSION, 'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'config': data})
+        with open(config_path + _CACHE_SUFFIX, 'w', encoding='utf-8') as file:
+            file.write(payload)
+    except (OSError, TypeError, ValueError):
+        pass  # the cache is best-effort; an unwritable directory just means re-parsing next time
+
+def _load_yaml(file):
+    # Imported on first use so a sidecar cache hit never loads PyYAML
+    import yaml
+    try:
+        from yaml import CSafeLoader as Loader
+    except ImportError:  # PyYAML built without libyaml
+        from yaml import SafeLoader as Loader
+    return yaml.load(file, Loader=Loader)
+
 def parse_config(path: str | None) -> dict:
     """
     Parse the configuration YAML file and return a structured config dictionary.
+    The validated result is cached in a '<path>.cache' JSON sidecar and reused while the file's mtime and
+    size are unchanged, and repeated calls in the same process skip even the sidecar read; callers always
+    get their own copy.
 
     Args:
         path: Path to the YAML configuration file, or None for default
@@ -32,17 +80,23 @@ def parse_config(path: str | None) -> dict:
     Raises:
         ValueError: If configuration is invalid or missing required fields
     """
-    default_path = os.path.join(os.getcwd(), 'downloader', 'examples', 'downloader.yaml')
-    config_path = path or default_path
+    config_path = path or _DEFAULT_CONFIG_PATH
 
     try:
-        with open(config_path, 'r') as file:
-            data = yaml.safe_load(file) or {}
+        st = os.stat(config_path)
+        memo = _CONFIG_MEMO.get(config_path)
+        if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+            return copy.deepcopy(memo[2])
+        if (cached := _read_config_cache(config_path, st)) is not None:
+            _CONFIG_MEMO[config_path] = (st.st_mtime_ns, st.st_size, copy.deepcopy(cached))
+            return cached
+        # Bytes go straight to libyaml, which decodes UTF-8 itself
+        with open(config_path, 'rb') as file:
+            data = _load_yaml(file) or {}
     except Exception as e:
         raise ValueError(f"Failed to load config: {e}")
 
-    required_sections = ['extensions', 'output', 'download', 'logging']
-    missing = [s for s in required_sections if s not in data]
+    missing = [s for s in _REQUIRED_SECTIONS if s not in data]
     if missing:
         raise ValueError(f"Missing sections: {', '.join(missing)}")
     
@@ -84,15 +138,27 @@ def parse_config(path: str | None) -> dict:
         raise ValueError("'skip_failed' must be a boolean")
 
     logging = data['logging']
-    logging['level'] = logging.get('level', 'INFO').upper()
-    if logging['level'] not in ['DEBUG', 'INFO', 'WARNING', 'ERROR']:
-        raise ValueError(f"Invalid log level: {logging['level']}")
+    logging['level'] = _normalize_level(logging.get('level', 'INFO'))
     logging['file'] = logging.get('file')
     logging['to_console'] = logging.get('to_console', True) #default state is console logging
     logging['to_syslog'] = logging.get('to_syslog', False)
 
+    _write_config_cache(config_path, st, data)
+    _CONFIG_MEMO[config_path] = (st.st_mtime_ns, st.st_size, copy.deepcopy(data))
     return data
 
+def _normalize_level(level: str) -> str:
+    """
+    Upper-case a log level name and check that it is one of the supported levels.
+
+    Raises:
+        ValueError: If the level is not supported
+    """
+    level = level.upper()
+    if level not in _LOG_LEVELS:
+        raise ValueError(f"Invalid log level: {level}")
+    return level
+
 def _parse_extension_string(extension_str: str) -> dict:
     """
     Parse an extension string into a dict with 'name' and 'version' fields.
@@ -103,8 +169,9 @@ def _parse_extension_string(extension_str: str) -> dict:
     Returns:
         Dictionary with 'name' and 'version' fields
     """
-    parts = extension_str.rsplit('@', 1)
-    return {'name': parts[0], 'version': parts[1] if len(parts) > 1 else 'latest'}
+    # Extension IDs cannot contain '@', so the first '@' is the version separator
+    name, sep, version = extension_str.partition('@')
+    return {'name': name, 'version': version if sep else 'latest'}
 
 def parse_cli_config(**kwargs) -> dict:
     """
@@ -164,7 +231,7 @@ def parse_cli_config(**kwargs) -> dict:
 
     logging = {}
     if (ll := kwargs.get("log_level")) is not None:
-        logging['level'] = ll.upper()
+        logging['level'] = _normalize_level(ll)
     if (lf := kwargs.get("log_file")) is not None:
         logging['file'] = lf
     if logging:
@@ -189,15 +256,16 @@ def merge_configs(yaml_config: dict, cli_config: dict) -> dict:
     Returns:
         Merged configuration dictionary
     """
-    merged = yaml_config.copy()
+    # Copy one level deep so updating a section below never writes through to yaml_config
+    merged = {k: (dict(v) if isinstance(v, dict) else v) for k, v in yaml_config.items()}
     
     # Handle extensions specially - if CLI has extensions, replace YAML extensions
     if 'extensions' in cli_config:
         merged['extensions'] = cli_config['extensions'].copy()
     
     # Apply exclude_extensions if present (works on either YAML or CLI extensions)
-    if 'exclude_extensions' in cli_config:
-        excluded_names = {ext['name'] for ext in cli_config['exclude_extensions']}
+    excluded_names = frozenset(ext['name'] for ext in cli_config.get('exclude_extensions', ()))
+    if excluded_names:
         merged['extensions'] = [
             ext for ext in merged.get('extensions', [])
             if ext['name'] not in excluded_names
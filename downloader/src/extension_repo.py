@@ -1,129 +1,347 @@
+import hashlib
+import logging
 import os
+import shutil
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as _UrllibHTTPError
+from urllib3.util.retry import Retry
 from pathlib import Path
 from time import sleep
 from logging import Logger
 
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib parser
+    orjson = None
 
-def get_vscode_vsix_url(ext_name: str, version: str = "latest") -> tuple[str, str]:
+_NULL_LOGGER = logging.getLogger(__name__ + ".null")
+_NULL_LOGGER.addHandler(logging.NullHandler())
+_NULL_LOGGER.propagate = False
+_MAX_WORKERS = 8
+_COPY_BUFSIZE = 1024 * 1024  # 1 MiB
+
+_QUERY_URL = "https://marketplace.visualstudio.com/_apis/public/gallery/extensionquery"
+_QUERY_HEADERS = {
+    "Accept": "application/json;api-version=3.0-preview.1",
+    "Content-Type": "application/json",
+}
+
+
+def _build_session(retries: int = 0) -> requests.Session:
+    """
+    Build a keep-alive session. With ``retries``, its adapter retries failed connections and
+    429/5xx responses with exponential backoff, honoring Retry-After.
+    """
+    session = requests.Session()
+    max_retries = Retry(
+        total=retries,
+        backoff_factor=1.0,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["GET", "POST", "HEAD"])
+    ) if retries else 0
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=max_retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared by every marketplace/update request in the process so TCP+TLS connections are reused
+_SESSION = _build_session()
+
+
+@lru_cache(maxsize=None)
+def _download_session(retries: int) -> requests.Session:
+    """
+    Session used by download_extensions for a given retry budget (normally one per process).
+    ``retries`` is the total number of attempts, so the adapter gets one fewer retry.
+    """
+    return _build_session(retries - 1) if retries > 1 else _SESSION
+
+
+def _preallocate(fd: int, length: str) -> None:
+    # Content-Length is the encoded size, so the file is truncated to what was written afterwards
+    if not length.isdigit() or length == "0":
+        return
+    try:
+        os.posix_fallocate(fd, 0, int(length))
+    except (AttributeError, OSError):
+        pass  # preallocation is only an optimization
+
+
+def _range_headers(offset: int, validator: str | None) -> dict | None:
+    # Resume only against a validator from the first response: If-Range makes the server send the
+    # whole file (200) instead of a tail that belongs to a newer version. Without one, start over.
+    if not offset or not validator:
+        return None
+    # Byte offsets only line up with the unencoded body, so ranged requests ask for identity
+    return {"Range": f"bytes={offset}-", "If-Range": validator, "Accept-Encoding": "identity"}
+
+
+def _range_validator(response: requests.Response) -> str | None:
+    # If-Range needs a strong ETag; a weak one cannot validate a byte range, so fall back to Last-Modified
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _json_body(res: requests.Response):
+    """
+    Parses a JSON response body; the marketplace returns the full version history per extension,
+    so orjson is used for it when installed.
+    """
+    if orjson is not None:
+        return orjson.loads(res.content)
+    return res.json()
+
+
+def _split_name(name) -> tuple[str, str]:
+    """
+    Splits 'publisher.name' at the first dot; returns empty parts for anything malformed.
+    """
+    if not isinstance(name, str):
+        return ("", "")
+    publisher, _, ext_name = name.partition(".")
+    return (publisher, ext_name)
+
+
+def get_vscode_vsix_url(ext_name: str, version: str = "latest",
+                        session: requests.Session = _SESSION) -> tuple[str, str]:
     """
     Queries Microsoft's VS Code Marketplace for the given extension and returns
     the direct .vsix download URL and the resolved version.
     """
     publisher, name = ext_name.split(".")
-    url = "https://marketplace.visualstudio.com/_apis/public/gallery/extensionquery"
-    headers = {
-        "Accept": "application/json;api-version=3.0-preview.1",
-        "Content-Type": "application/json",
-    }
     payload = {
         "filters": [{"criteria": [{"filterType": 7, "value": ext_name}]}],
         "flags": 103
     }
 
-    res = requests.post(url, headers=headers, json=payload, timeout=15)
+    res = session.post(_QUERY_URL, headers=_QUERY_HEADERS, json=payload, timeout=15)
     res.raise_for_status()
-    data = res.json()
+    data = _json_body(res)
 
     try:
-        extension = data["results"][0]["extensions"][0]
-        versions = extension.get("versions", [])
-        if version != "latest":
-            for v in versions:
-                if v.get("version") == version:
-                    return (f"{v['assetUri']}/Microsoft.VisualStudio.Services.VSIXPackage", version)
-
-        # Default: use latest available version
-        latest_version = extension["versions"][0]
-        asset_uri = latest_version["assetUri"]
-        return (f"{asset_uri}/Microsoft.VisualStudio.Services.VSIXPackage", latest_version["version"])
-
+        return _select_version(data["results"][0]["extensions"][0], version)
     except (KeyError, IndexError):
         raise ValueError(f"Extension not found or invalid: {ext_name}")
 
 
-def download_extensions(extensions: list[dict], download_dir: str,
-                        retries: int = 3, skip_failed: bool = True, logger: Logger | None = None) -> list[str]:
+def _select_version(extension: dict, version: str) -> tuple[str, str]:
     """
-    Downloads VSCode extensions (.vsix) from Microsoft's official Marketplace.
+    Picks the requested version (or the latest one) from an extensionquery result entry.
+    """
+    versions = extension.get("versions", [])
+    if version != "latest":
+        for v in versions:
+            if v.get("version") == version:
+                return (f"{v['assetUri']}/Microsoft.VisualStudio.Services.VSIXPackage", version)
+
+    # Default: use latest available version
+    latest_version = extension["versions"][0]
+    asset_uri = latest_version["assetUri"]
+    return (f"{asset_uri}/Microsoft.VisualStudio.Services.VSIXPackage", latest_version["version"])
+
+
+def resolve_vsix_urls(extensions: list[dict],
+                      session: requests.Session = _SESSION) -> dict[tuple[str, str], tuple[str, str]]:
+    """
+    Resolves the .vsix download URLs of many extensions with a single extensionquery POST.
 
     Args:
-        extensions: List of dicts with "name" (e.g., 'ms-python.python') and
-                    "version" ('latest' or specific version)
-        download_dir: Directory where downloaded files will be saved
-        retries: Number of download retry attempts
-        skip_failed: Whether to continue if a download fails
-        logger: Logger instance (if None, logging is disabled)
+        extensions: List of dicts with "name" and optional "version" (as in download_extensions)
+        session: Session used for the query
 
     Returns:
-        List of local file paths for downloaded extensions (even if they failed to download)
+        Mapping of (name, version) as requested -> (download URL, resolved version). Extensions
+        the marketplace did not return are left out, so callers can fall back to get_vscode_vsix_url.
     """
-    os.makedirs(download_dir, exist_ok=True)
-    
-    if logger is None:
-        class NullLogger:
-            def debug(self, *args, **kwargs): pass
-            def info(self, *args, **kwargs): pass
-            def warning(self, *args, **kwargs): pass
-            def error(self, *args, **kwargs): pass
-        logger = NullLogger()
+    wanted = {(ext.get("name"), ext.get("version", "latest")) for ext in extensions
+              if all(_split_name(ext.get("name")))}
+    if not wanted:
+        return {}
 
-    downloaded_files = []
+    names = sorted({name for name, _ in wanted})
+    payload = {
+        "filters": [{
+            "criteria": [{"filterType": 7, "value": name} for name in names],
+            "pageSize": len(names)
+        }],
+        "flags": 103
+    }
 
-    for ext in extensions:
-        name = ext.get("name")
-        version = ext.get("version", "latest")
-        retry_count = 0
-        success = False
+    res = session.post(_QUERY_URL, headers=_QUERY_HEADERS, json=payload, timeout=30)
+    res.raise_for_status()
+    data = _json_body(res)
 
+    # Marketplace identifiers are case-insensitive
+    by_name = {}
+    for extension in (data.get("results") or [{}])[0].get("extensions", []):
         try:
-            publisher, ext_name = name.split(".")
-        except ValueError:
-            logger.error(f"Invalid extension name format: {name}")
-            if not skip_failed:
-                raise
+            key = f"{extension['publisher']['publisherName']}.{extension['extensionName']}".lower()
+        except (KeyError, TypeError):
+            continue
+        by_name[key] = extension
+
+    resolved = {}
+    for name, version in wanted:
+        extension = by_name.get(name.lower())
+        if extension is None:
+            continue
+        try:
+            resolved[(name, version)] = _select_version(extension, version)
+        except (KeyError, IndexError):
             continue
+    return resolved
 
-        logger.info(f"Fetching VSIX URL for {name}@{version}...")
+
+def _download_one(ext: dict, session: requests.Session, download_dir: str,
+                  retries: int, skip_failed: bool, logger,
+                  resolved: tuple[str, str] | None = None) -> tuple[str, str] | None:
+    """
+    Resolves (unless ``resolved`` is given) and downloads a single extension; returns its path and
+    SHA-256 hex digest, or None if it was skipped.
+    """
+    name = ext.get("name")
+    version = ext.get("version", "latest")
+
+    publisher, ext_name = _split_name(name)
+    if not publisher or not ext_name:
+        logger.error("Invalid extension name format: %s", name)
+        if not skip_failed:
+            raise ValueError(f"Invalid extension name format: {name}")
+        return None
+
+    if resolved is not None:
+        url, resolved_version = resolved
+    else:
+        logger.info("Fetching VSIX URL for %s@%s...", name, version)
         try:
-            url, resolved_version = get_vscode_vsix_url(name, version)
+            url, resolved_version = get_vscode_vsix_url(name, version, session)
         except Exception as e:
-            logger.error(f"Failed to resolve {name}: {e}")
+            logger.error("Failed to resolve %s: %s", name, e)
             if not skip_failed:
                 raise
-            continue
+            return None
+
+    logger.info("Downloading %s@%s", name, resolved_version)
+    file_path = Path(download_dir) / f"{ext_name}-{resolved_version}.vsix"
+
+    # Connection failures and 429/5xx responses are retried (with backoff) by the session's adapter;
+    # only a body that breaks off mid-stream, which the adapter cannot replay, is retried here, and
+    # such a retry asks for the missing tail only
+    sha256 = hashlib.sha256()
+    offset = 0
+    validator = None
+    attempts = max(retries, 1)
+    for attempt in range(1, attempts + 1):
+        try:
+            headers = _range_headers(offset, validator)
+            with session.get(url, headers=headers, stream=True, timeout=(5, 30)) as response:
+                if headers and response.status_code == 416:
+                    # The partial file does not match the remote one; start over from byte 0
+                    offset = 0
+                    continue
+                resuming = headers is not None and response.status_code == 206
+                if response.status_code != 200 and not resuming:
+                    raise Exception(f"Bad response: {response.status_code}")
+                if not resuming:
+                    sha256 = hashlib.sha256()
+                    validator = _range_validator(response)
+
+                # Let urllib3 undo any Content-Encoding, then copy in large blocks, hashing on the way
+                # so packaging does not have to read the file a second time
+                response.raw.decode_content = True
+                read = response.raw.read
+                with open(file_path, "ab" if resuming else "wb") as f:
+                    if not resuming:
+                        _preallocate(f.fileno(), response.headers.get("Content-Length", ""))
+                    try:
+                        while chunk := read(_COPY_BUFSIZE):
+                            sha256.update(chunk)
+                            f.write(chunk)
+                    finally:
+                        # Drops the preallocated tail; after a broken body this is where a retry resumes
+                        offset = f.tell()
+                        f.truncate(offset)
 
-        logger.info(f"Downloading {name}@{resolved_version}")
+            logger.info("✅ Downloaded %s → %s", name, file_path)
+            return str(file_path), sha256.hexdigest()
 
-        while retry_count < retries and not success:
-            try:
-                response = requests.get(url, stream=True, timeout=30)
-                if response.status_code != 200:
-                    raise Exception(f"Bad response: {response.status_code}")
+        except (requests.exceptions.ChunkedEncodingError, _UrllibHTTPError) as e:
+            logger.warning("Attempt %d/%d failed for %s: %s", attempt, attempts, name, e)
+        except Exception as e:
+            logger.warning("Download failed for %s: %s", name, e)
+            break
 
-                file_path = Path(download_dir) / f"{ext_name}-{resolved_version}.vsix"
+    file_path.unlink(missing_ok=True)  # never leave a truncated .vsix behind
+    logger.error("❌ Failed to download %s.", name)
+    if not skip_failed:
+        raise RuntimeError(f"Download failed: {name}")
+    return None
 
-                with open(file_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
 
-                logger.info(f"✅ Downloaded {name} → {file_path}")
-                downloaded_files.append(str(file_path))
-                success = True
+def download_extensions(extensions: list[dict], download_dir: str,
+                        retries: int = 3, skip_failed: bool = True, logger: Logger | None = None,
+                        digests: dict[str, str] | None = None) -> list[str]:
+    """
+    Downloads VSCode extensions (.vsix) from Microsoft's official Marketplace.
 
-            except Exception as e:
-                retry_count += 1
-                logger.warning(f"Attempt {retry_count}/{retries} failed for {name}: {e}")
-                if retry_count < retries:
-                    sleep(2)
+    Extensions are fetched concurrently over a pooled session whose adapter handles retries; the
+    returned paths keep the order of ``extensions``.
 
-        if not success:
-            logger.error(f"❌ Failed to download {name} after {retries} retries.")
-            if not skip_failed:
-                raise RuntimeError(f"Download failed: {name}")
+    Args:
+        extensions: List of dicts with "name" (e.g., 'ms-python.python') and
+                    "version" ('latest' or specific version)
+        download_dir: Existing directory where downloaded files will be saved (the orchestrator
+                      creates it through ensure_paths)
+        retries: Total attempts per request (connection errors, 429/5xx responses, and bodies that
+                 break off mid-stream)
+        skip_failed: Whether to continue if a download fails
+        logger: Logger instance (if None, logging is disabled)
+        digests: Optional dict that is filled with path -> SHA-256 hex digest of each downloaded
+                 file, computed while downloading (see build_zip_and_manifest)
 
-    return downloaded_files
+    Returns:
+        List of local file paths for successfully downloaded extensions
+    """
+    if logger is None:
+        logger = _NULL_LOGGER
+
+    session = _download_session(retries)
+
+    # One batched query up front; anything it misses is resolved individually by its worker
+    logger.info("Resolving VSIX URLs for %d extension(s)...", len(extensions))
+    try:
+        resolved = resolve_vsix_urls(extensions, session)
+    except Exception as e:
+        logger.warning("Batched marketplace query failed, resolving extensions individually: %s", e)
+        resolved = {}
+
+    results: list[tuple[str, str] | None] = [None] * len(extensions)
+
+    executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+    try:
+        futures = {
+            executor.submit(_download_one, ext, session, download_dir, retries, skip_failed, logger,
+                            resolved.get((ext.get("name"), ext.get("version", "latest")))): index
+            for index, ext in enumerate(extensions)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    except BaseException:
+        # First failure with skip_failed=False: drop the queued downloads and surface it
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    downloaded = [result for result in results if result is not None]
+    if digests is not None:
+        digests.update(downloaded)
+    return [path for path, _ in downloaded]
 
 
 def download_vscode_server(commit_id: str, output_dir: str, retries: int = 3,
@@ -133,53 +351,62 @@ def download_vscode_server(commit_id: str, output_dir: str, retries: int = 3,
 
     Args:
         commit_id: The VS Code commit ID
-        output_dir: Directory where the server tarball will be saved
+        output_dir: Existing directory where the server tarball will be saved
         retries: Number of download retry attempts
         logger: Logger instance (if None, logging is disabled)
 
     Returns:
         Path to the downloaded server tarball, or None if download failed
     """
-    os.makedirs(output_dir, exist_ok=True)
-    
     if logger is None:
-        class NullLogger:
-            def debug(self, *args, **kwargs): pass
-            def info(self, *args, **kwargs): pass
-            def warning(self, *args, **kwargs): pass
-            def error(self, *args, **kwargs): pass
-        logger = NullLogger()
+        logger = _NULL_LOGGER
 
     url = f"https://update.code.visualstudio.com/commit:{commit_id}/server-linux-x64/stable"
     output_path = Path(output_dir) / f"vscode-server-{commit_id}.tar.gz"
 
-    logger.info(f"Downloading VS Code Server for commit {commit_id}...")
-    logger.debug(f"Server URL: {url}")
+    logger.info("Downloading VS Code Server for commit %s...", commit_id)
+    logger.debug("Server URL: %s", url)
 
     retry_count = 0
     success = False
+    offset = 0  # bytes already on disk from a broken attempt; a retry only asks for the rest
+    validator = None
 
     while retry_count < retries and not success:
         try:
-            response = requests.get(url, stream=True, timeout=60)
-            response.raise_for_status()
-
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-
-            logger.info(f"✅ Downloaded VS Code Server → {output_path}")
+            headers = _range_headers(offset, validator)
+            with _SESSION.get(url, headers=headers, stream=True, timeout=60) as response:
+                if headers and response.status_code == 416:
+                    offset = 0
+                    raise Exception("Partial download does not match the remote file; restarting")
+                response.raise_for_status()
+                resuming = headers is not None and response.status_code == 206
+                if not resuming:
+                    validator = _range_validator(response)
+
+                # Same raw block copy as the VSIX workers; iter_content would decode the same way
+                response.raw.decode_content = True
+                with open(output_path, 'ab' if resuming else 'wb') as f:
+                    if not resuming:
+                        _preallocate(f.fileno(), response.headers.get("Content-Length", ""))
+                    try:
+                        shutil.copyfileobj(response.raw, f, length=_COPY_BUFSIZE)
+                    finally:
+                        offset = f.tell()
+                        f.truncate(offset)
+
+            logger.info("✅ Downloaded VS Code Server → %s", output_path)
             success = True
 
         except Exception as e:
             retry_count += 1
-            logger.warning(f"Attempt {retry_count}/{retries} failed for VS Code Server: {e}")
+            logger.warning("Attempt %d/%d failed for VS Code Server: %s", retry_count, retries, e)
             if retry_count < retries:
                 sleep(2)
 
     if not success:
-        logger.error(f"❌ Failed to download VS Code Server after {retries} retries.")
+        output_path.unlink(missing_ok=True)
+        logger.error("❌ Failed to download VS Code Server after %d retries.", retries)
         return None
 
     return str(output_path)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from __future__ import annotations
-import logging, os, time
+import atexit, logging, os, queue, time
 from dataclasses import dataclass
-from logging.handlers import SysLogHandler
+from logging.handlers import QueueHandler, QueueListener, SysLogHandler
 
 _LEVELS = {
     "CRITICAL": logging.CRITICAL,
@@ -11,39 +11,39 @@ _LEVELS = {
     "DEBUG":    logging.DEBUG,
 }
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LogConfig:
     name: str = "downloader"
     level: str = "INFO"              
     log_file: str | None = None      
     to_syslog: bool = False
     to_console: bool = True           
-def _fmt() -> logging.Formatter:
-    fmt = logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s",
-                            "%Y-%m-%dT%H:%M:%SZ")
-    fmt.converter = time.gmtime  # UTC timestamps
-    return fmt
+# One formatter shared by every handler; formatting only happens for records a handler emits
+_FORMATTER = logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s",
+                               "%Y-%m-%dT%H:%M:%SZ")
+_FORMATTER.converter = time.gmtime  # UTC timestamps
 
 def get_logger(cfg: LogConfig) -> logging.Logger:
     logger = logging.getLogger(cfg.name)
     if getattr(logger, "_initialized_ok", False):
         return logger
     logger.setLevel(_LEVELS.get(cfg.level.upper(), logging.INFO))
-    fmt = _fmt()
+    fmt = _FORMATTER
+    handlers = []
 
     if cfg.log_file:
         os.makedirs(os.path.dirname(os.path.abspath(cfg.log_file)), exist_ok=True)
         fh = logging.FileHandler(cfg.log_file)
         fh.setFormatter(fmt)
         fh.setLevel(logger.level)
-        logger.addHandler(fh)
+        handlers.append(fh)
 
     if cfg.to_syslog:
         try:
             sh = SysLogHandler(address="/dev/log")
             sh.setFormatter(fmt)
             sh.setLevel(logger.level)
-            logger.addHandler(sh)
+            handlers.append(sh)
         except Exception:
             pass  
 
@@ -51,7 +51,16 @@ def get_logger(cfg: LogConfig) -> logging.Logger:
         ch = logging.StreamHandler()
         ch.setFormatter(fmt)
         ch.setLevel(logger.level)
-        logger.addHandler(ch)
+        handlers.append(ch)
+
+    if handlers:
+        # The real handlers write from a listener thread, so a log call only costs an enqueue;
+        # the listener is stopped (and the queue drained) at interpreter exit
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        logger.addHandler(QueueHandler(records))
 
     logger.propagate = False
     setattr(logger, "_initialized_ok", True)
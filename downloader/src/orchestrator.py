@@ -30,6 +30,7 @@ def run(config_path: str | None = None, **kwargs) -> int:
 
     config = merge_configs(yaml_config, cli_config)
 
+    # Creates (and write-checks) the output directory once; the download stages rely on it existing
     path_result = ensure_paths(
         config.get("output")["directory"],       # cache_dir
         config.get("output")["directory"],       # output_zip - same as cache_dir; ZIP file is written to this directory
@@ -44,11 +45,14 @@ def run(config_path: str | None = None, **kwargs) -> int:
         to_syslog=config.get("logging").get("to_syslog", False)
     ))
 
+    # SHA-256 digests computed during the download, so packaging does not re-read the files to hash them
+    digests = {}
     extensions = download_extensions(config.get("extensions"),
                                      config.get("output")["directory"],
                                      config.get("download")["retries"],
                                      config.get("download")["skip_failed"],
-                                     logger)
+                                     logger,
+                                     digests=digests)
 
     # Download VS Code Server if commit_id is provided
     server_path = None
@@ -71,7 +75,8 @@ def run(config_path: str | None = None, **kwargs) -> int:
         config.get("extensions"),
         commit_id,
         server_path,
-        logger
+        logger,
+        digests=digests
     )
 
     return 0
@@ -2,17 +2,61 @@ from __future__ import annotations
 
 import hashlib
 import json
+import logging
+import os
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Tuple, List
 from logging import Logger
 
+try:
+    import orjson
+except ImportError:  # optional; falls back to the stdlib encoder
+    orjson = None
+
+_NULL_LOGGER = logging.getLogger(__name__ + ".null")
+_NULL_LOGGER.addHandler(logging.NullHandler())
+_NULL_LOGGER.propagate = False
+_COPY_BUFSIZE = 1024 * 1024  # 1 MiB
+# Payloads that are already compressed (a .vsix is itself a ZIP); deflating them again costs CPU
+# for next to no size reduction, so they are stored as-is
+_STORED_SUFFIXES = frozenset((".vsix", ".gz", ".tgz", ".zip"))
+
+
+def _stat_and_sha256(path: Path) -> tuple[os.stat_result, str] | None:
+    """Return the file's stat result and SHA-256 hex digest, or None if it does not exist."""
+    try:
+        with path.open("rb") as fh:
+            return os.fstat(fh.fileno()), hashlib.file_digest(fh, "sha256").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _write_member(zf: zipfile.ZipFile, src: Path, arcname: str, st: os.stat_result, sha256=None) -> None:
+    """Copy a file into the archive in 1 MiB blocks, feeding each block to ``sha256`` if given.
+
+    Stores the same metadata as ``zf.write`` (as ``ZipInfo.from_file`` would, but from the
+    caller's ``st`` instead of another stat), and a file that also needs hashing is read only once.
+    """
+    zinfo = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[:6])
+    zinfo.external_attr = (st.st_mode & 0xFFFF) << 16  # Unix attributes
+    zinfo.file_size = st.st_size
+    zinfo.compress_type = zipfile.ZIP_STORED if src.suffix.lower() in _STORED_SUFFIXES else zf.compression
+    with src.open("rb") as fh, zf.open(zinfo, "w") as dst:
+        while chunk := fh.read(_COPY_BUFSIZE):
+            if sha256 is not None:
+                sha256.update(chunk)
+            dst.write(chunk)
+
 
 def build_zip_and_manifest(files: List[str], output_dir: str,
                           name_template: str, extension_config: List[dict] | None = None,
                           commit_id: str | None = None,
-                          server_path: str | None = None, logger: Logger | None = None) -> Tuple[str, str]:
+                          server_path: str | None = None, logger: Logger | None = None,
+                          digests: dict[str, str] | None = None) -> Tuple[str, str]:
     """Build a ZIP archive and a JSON manifest for a list of files.
 
     Args:
@@ -23,6 +67,8 @@ def build_zip_and_manifest(files: List[str], output_dir: str,
         commit_id: VS Code commit ID (optional)
         server_path: Path to the downloaded VS Code Server tarball (optional)
         logger: Logger instance (optional)
+        digests: SHA-256 hex digests keyed by file path, as collected by download_extensions;
+                 files listed here are not re-read just to hash them (optional)
 
     Returns:
         Tuple of (zip_path, manifest_path) containing paths to created files
@@ -39,12 +85,7 @@ def build_zip_and_manifest(files: List[str], output_dir: str,
     It remains as a separate file in the output directory.
     """
     if logger is None:
-        class NullLogger:
-            def debug(self, *args, **kwargs): pass
-            def info(self, *args, **kwargs): pass
-            def warning(self, *args, **kwargs): pass
-            def error(self, *args, **kwargs): pass
-        logger = NullLogger()
+        logger = _NULL_LOGGER
 
     # Convert output directory string to Path object for easier path manipulation
     out_dir = Path(output_dir)
@@ -72,16 +113,25 @@ def build_zip_and_manifest(files: List[str], output_dir: str,
     # zip_path.stem gives filename without extension
     manifest_path = out_dir / (zip_path.stem + ".json")
 
-    logger.info(f"Building archive: {zip_path}")
+    logger.info("Building archive: %s", zip_path)
 
     # Capture current timestamp in ISO 8601 format for manifest metadata
     # Example: "2025-10-25T14:30:45.123456+00:00"
     now_iso = datetime.now(timezone.utc).isoformat()
 
+    # The server tarball is the largest input and is not zipped, so it is hashed on a worker thread
+    # (hashlib releases the GIL) while the extensions are written to the archive below
+    server_future = None
+    if server_path:
+        executor = ThreadPoolExecutor(max_workers=1)
+        server_future = executor.submit(_stat_and_sha256, Path(server_path))
+        executor.shutdown(wait=False)  # the submitted hash still runs to completion
+
     # Initialize list to store metadata for each file
     manifest_entries = []
 
-    # Create ZIP archive with DEFLATE compression (standard compression algorithm)
+    # Create ZIP archive with DEFLATE compression (standard compression algorithm) as the default;
+    # already-compressed members such as .vsix files are stored (see _write_member)
     # Using context manager ensures ZIP is properly closed even if errors occur
     with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
         # Iterate through each file path (or empty list if files is None)
@@ -89,8 +139,11 @@ def build_zip_and_manifest(files: List[str], output_dir: str,
             # Convert file path string to Path object
             src = Path(f)
             
-            # Check if the source file actually exists on disk
-            if not src.exists():
+            # One stat both checks the source file exists on disk and gets its metadata
+            # (size, modification time, etc.)
+            try:
+                stat = os.stat(f)
+            except FileNotFoundError:
                 # File is missing - add entry to manifest marking it as not present
                 # This allows tracking what should have been included but wasn't found
                 manifest_entries.append({
@@ -104,36 +157,34 @@ def build_zip_and_manifest(files: List[str], output_dir: str,
             # This flattens the directory structure - all files go in ZIP root
             arcname = src.name
             
+            # SHA-256 hash for file integrity verification; the downloader normally hashed the
+            # bytes as they arrived, otherwise it is computed while the file is copied into the ZIP
+            digest = (digests or {}).get(f)
+            sha256 = hashlib.sha256() if digest is None else None
+
             # Add file to ZIP archive using the archive name (filename only)
-            # str(src) converts Path to string for zipfile compatibility
-            zf.write(str(src), arcname=arcname)
+            _write_member(zf, src, arcname, stat, sha256)
+            if sha256 is not None:
+                digest = sha256.hexdigest()
 
-            # Compute SHA-256 hash for file integrity verification
-            # Initialize hash object
-            sha256 = hashlib.sha256()
-            
-            # Read file in binary mode and hash in chunks to handle large files efficiently
-            # Using 8KB chunks to balance memory usage and I/O performance
-            with src.open("rb") as fh:
-                # Read chunks until empty bytes returned (end of file)
-                for chunk in iter(lambda: fh.read(8192), b""):
-                    sha256.update(chunk)  # Update hash with current chunk
-
-            # Get file metadata (size, modification time, etc.)
-            stat = src.stat()
-            
             # Add complete metadata entry for this file to manifest
             manifest_entries.append({
                 "name": arcname,                    # Filename as stored in ZIP
                 "path": arcname,                    # Path within ZIP (same as name since flattened)
                 "size": stat.st_size,               # File size in bytes
-                "sha256": sha256.hexdigest(),       # SHA-256 hash as hexadecimal string
+                "sha256": digest,                   # SHA-256 hash as hexadecimal string
+                "crc32": zf.getinfo(arcname).CRC,   # CRC-32 recorded in the ZIP central directory
                 "mtime": datetime.fromtimestamp(    # File modification time in ISO 8601 format
                     stat.st_mtime, timezone.utc
                 ).isoformat(),
                 "present": True,                    # Flag indicating file was successfully included
             })
 
+            # Delete the extension file as soon as it is in the ZIP, so peak disk usage is the
+            # archive plus one file rather than the archive plus every download
+            # Note: the server tarball is never passed in here - it stays as a separate artifact
+            src.unlink()
+
     # Extract extension names for the manifest
     extension_names = []
     if extension_config:
@@ -154,37 +205,28 @@ def build_zip_and_manifest(files: List[str], output_dir: str,
     if commit_id:
         manifest["vscode_commit_id"] = commit_id
     
-    if server_path:
-        server_file = Path(server_path)
-        if server_file.exists():
-            # Get server file metadata
-            server_stat = server_file.stat()
-            server_sha256 = hashlib.sha256()
-            with server_file.open("rb") as fh:
-                for chunk in iter(lambda: fh.read(8192), b""):
-                    server_sha256.update(chunk)
-            
-            manifest["server_package"] = server_file.name
-            manifest["server_size"] = server_stat.st_size
-            manifest["server_sha256"] = server_sha256.hexdigest()
+    if server_future is not None and (server_info := server_future.result()) is not None:
+        # Get server file metadata
+        server_stat, server_sha256 = server_info
+
+        manifest["server_package"] = Path(server_path).name
+        manifest["server_size"] = server_stat.st_size
+        manifest["server_sha256"] = server_sha256
 
     # Write manifest to JSON file with pretty formatting
     # indent=2 with 2-space indentation
-    # ensure_ascii=False allows Unicode characters in filenames
-    with manifest_path.open("w", encoding="utf-8") as mf:
-        json.dump(manifest, mf, indent=2, ensure_ascii=False)
-
-    logger.info(f"Created manifest: {manifest_path}")
+    # ensure_ascii=False allows Unicode characters in filenames (orjson always writes UTF-8)
+    if orjson is not None:
+        manifest_path.write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    else:
+        with manifest_path.open("w", encoding="utf-8") as mf:
+            json.dump(manifest, mf, indent=2, ensure_ascii=False)
 
-    # Delete the extension files after the zip is created
-    # Note: Do NOT delete the server tarball - it stays as a separate artifact
-    for f in files:
-        if Path(f).exists():
-            Path(f).unlink()
+    logger.info("Created manifest: %s", manifest_path)
 
-    logger.info(f"Packaged {len(files or [])} extension(s)")
+    logger.info("Packaged %d extension(s)", len(files or []))
     if server_path and Path(server_path).exists():
-        logger.info(f"VS Code Server package: {Path(server_path).name}")
+        logger.info("VS Code Server package: %s", Path(server_path).name)
 
     # Return paths as strings (convert Path objects back to strings)
     return str(zip_path), str(manifest_path)
@@ -1,12 +1,12 @@
 from __future__ import annotations
-import os, shutil
+import os, shutil, stat
 from dataclasses import dataclass
 from pathlib import Path
 
 class PathGuardError(RuntimeError):
     pass
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Paths:
     cache_dir: Path
     work_dir: Path
@@ -14,7 +14,7 @@ class Paths:
     output_zip: Path
     log_file: Path | None = None
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class GuardResult:
     paths: Paths
     warnings: tuple[str, ...] = ()
@@ -23,15 +23,29 @@ def _must_abs(p: Path, label: str):
     if not p.is_absolute():
         raise PathGuardError(f"{label} must be an absolute path: {p}")
 
-def _writable_dir(p: Path):
-    p.mkdir(parents=True, exist_ok=True)
-    if not p.is_dir():
+def _writable_dir(p: Path, strict: bool = False):
+    try:
+        st = os.stat(p)
+    except FileNotFoundError:
+        st = None
+    if st is None:
+        try:
+            p.mkdir(parents=True, exist_ok=True)
+        except FileExistsError:
+            raise PathGuardError(f"Not a directory: {p}") from None
+    elif not stat.S_ISDIR(st.st_mode):
         raise PathGuardError(f"Not a directory: {p}")
-    test = p / ".wcheck"
-    test.write_text("ok")
-    test.unlink(missing_ok=True)
+    # One faccessat(2) instead of a probe file; it honours read-only mounts, but some network
+    # filesystems enforce rules it cannot see, so strict callers still write a probe file
+    if not os.access(p, os.W_OK | os.X_OK):
+        raise PathGuardError(f"Directory is not writable: {p}")
+    if strict:
+        test = p / ".wcheck"
+        test.write_text("ok")
+        test.unlink(missing_ok=True)
 
-def ensure_paths(cache_dir: str, output_zip: str, log_file: str | None = None) -> GuardResult:
+def ensure_paths(cache_dir: str, output_zip: str, log_file: str | None = None,
+                 strict: bool = False, check_disk: bool = True) -> GuardResult:
     cache = Path(cache_dir).expanduser().resolve()
     outzip = Path(output_zip).expanduser().resolve()
     logf = Path(log_file).expanduser().resolve() if log_file else None
@@ -43,22 +57,37 @@ def ensure_paths(cache_dir: str, output_zip: str, log_file: str | None = None) -
     work = cache / "builder_work"
     vsix = cache / "vsix_norm"
 
-    _writable_dir(cache)
-    _writable_dir(work)
-    _writable_dir(vsix)
-    _writable_dir(outzip.parent)
-    if logf: _writable_dir(logf.parent)
+    _writable_dir(cache, strict)
+    _writable_dir(work, strict)
+    _writable_dir(vsix, strict)
+    _writable_dir(outzip.parent, strict)
+    if logf: _writable_dir(logf.parent, strict)
 
     warns = []
-    try:
-        free = shutil.disk_usage(cache).free
-        if free < 50 * 1024 * 1024:
-            warns.append(f"Low free space under {cache}: {free} bytes")
-    except Exception:
-        pass
+    # statvfs() can block for a long time on NFS/FUSE mounts, so callers may skip the low-space check
+    if check_disk:
+        try:
+            free = shutil.disk_usage(cache).free
+            if free < 50 * 1024 * 1024:
+                warns.append(f"Low free space under {cache}: {free} bytes")
+        except Exception:
+            pass
 
     return GuardResult(Paths(cache, work, vsix, outzip, logf), tuple(warns))
 
+# Successful lookups only, keyed with PATH so a changed search path is walked again; a miss is
+# never cached, so a CLI installed later in a long-lived process is still found
+_WHICH_HITS: dict[tuple[str, str | None], str] = {}
+
+def _which(name: str, search_path: str | None) -> str | None:
+    key = (name, search_path)
+    found = _WHICH_HITS.get(key)
+    if found is None:
+        found = shutil.which(name, path=search_path)
+        if found is not None:
+            _WHICH_HITS[key] = found
+    return found
+
 def validate_code_cli(code_cli_path: str | None) -> tuple[str | None, tuple[str, ...]]:
     warns = []
     if not code_cli_path:
@@ -68,6 +97,6 @@ def validate_code_cli(code_cli_path: str | None) -> tuple[str | None, tuple[str,
         if not p.exists(): return None, (f"code CLI not found: {p}",)
         if not os.access(p, os.X_OK): warns.append(f"code CLI not executable: {p}")
         return str(p), tuple(warns)
-    found = shutil.which(code_cli_path)
+    found = _which(code_cli_path, os.environ.get("PATH"))
     if not found: return None, (f"'{code_cli_path}' not found in PATH",)
     return found, tuple(warns)
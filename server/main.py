@@ -1,6 +1,9 @@
 import os
+import unicodedata
+from functools import lru_cache
 from pathlib import Path
-from flask import Flask, send_file, jsonify
+from urllib.parse import quote
+from flask import Flask, Response, send_file, jsonify
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -10,6 +13,20 @@ load_dotenv()
 app = Flask(__name__)
 FILES_DIR = Path(os.getenv("FILES_DIR", "./files"))
 
+# Hand file bodies to a front-end server instead of copying them through Python:
+# X_ACCEL_REDIRECT_PREFIX names an nginx internal location aliased to FILES_DIR (e.g. "/_internal/"),
+# USE_X_SENDFILE=true emits X-Sendfile (Apache/lighttpd) with the file's absolute path
+X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX", "").rstrip("/")
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "false").lower() == "true"
+
+# secure_filename normalises unicode and runs several substitutions; clients keep asking for the
+# same few names, so the sanitised result is memoised per requested name
+_safe_filename = lru_cache(maxsize=1024)(secure_filename)
+
+# Lower-case suffixes; names are lowered once and matched with str.endswith
+_ZIP_SUFFIX = ".zip"
+_MANIFEST_SUFFIXES = (".json", ".manifest")
+
 CORS(app, resources={r"/*": {"origins": os.getenv("CORS_ORIGINS", "*")}})
 
 def ensure_files_dir():
@@ -17,23 +34,78 @@ def ensure_files_dir():
     FILES_DIR.mkdir(parents=True, exist_ok=True)
 
 
+# Created once here rather than on every request; _get_listing recreates it if it is removed later
+ensure_files_dir()
+
+
+def _get_listing():
+    """
+    Return the zip and manifest names in FILES_DIR and the newest of each, from a single scandir
+    pass. Rescanned on every request: a file rewritten in place changes its own mtime but not the
+    directory's, so no cheaper validity check would notice it.
+    """
+    try:
+        it = os.scandir(FILES_DIR)
+    except FileNotFoundError:
+        ensure_files_dir()
+        it = os.scandir(FILES_DIR)
+
+    zips, manifests = [], []
+    with it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            name = entry.name
+            lname = name.lower()
+            if lname.endswith(_ZIP_SUFFIX):
+                zips.append((entry.stat().st_mtime, name))
+            elif lname.endswith(_MANIFEST_SUFFIXES):
+                manifests.append((entry.stat().st_mtime, name))
+
+    return {
+        "zips": [name for _, name in zips],
+        "manifests": [name for _, name in manifests],
+        "latest_zip": max(zips, key=lambda f: f[0])[1] if zips else None,
+        "latest_manifest": max(manifests, key=lambda f: f[0])[1] if manifests else None,
+    }
+
+
+def _send(file_path, mimetype, download_name):
+    """Serve a file from FILES_DIR, via X-Accel-Redirect when a front-end prefix is configured."""
+    if not X_ACCEL_REDIRECT_PREFIX:
+        return send_file(
+            file_path,
+            mimetype=mimetype,
+            as_attachment=False,
+            download_name=download_name
+        )
+    response = Response(mimetype=mimetype)
+    response.headers["X-Accel-Redirect"] = f"{X_ACCEL_REDIRECT_PREFIX}/{file_path.name}"
+    response.headers.set("Content-Disposition", "inline", **_disposition_names(download_name))
+    return response
+
+
+def _disposition_names(download_name):
+    """Content-Disposition filename parameters, encoded the same way send_file does it."""
+    try:
+        download_name.encode("ascii")
+    except UnicodeEncodeError:
+        # Latin-1 headers cannot carry the raw name: ASCII fallback plus an RFC 5987 filename*
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        quoted = quote(download_name, safe="!#$&+-.^_`|~")
+        return {"filename": simple, "filename*": f"UTF-8''{quoted}"}
+    return {"filename": download_name}
+
+
 @app.route("/")
 def index():
     """List available files."""
-    ensure_files_dir()
-    
+    listing = _get_listing()
     files = {
-        "zips": [],
-        "manifests": []
+        "zips": listing["zips"],
+        "manifests": listing["manifests"]
     }
     
-    for file_path in FILES_DIR.iterdir():
-        if file_path.is_file():
-            if file_path.suffix.lower() == ".zip":
-                files["zips"].append(file_path.name)
-            elif file_path.suffix.lower() in [".json", ".manifest"]:
-                files["manifests"].append(file_path.name)
-    
     return jsonify({
         "message": "File server is running",
         "files": files,
@@ -50,94 +122,57 @@ def index():
 @app.route("/server/<filename>")
 def serve_server(filename):
     """Serve a server file by name."""
-    ensure_files_dir()
-    file_path = FILES_DIR / secure_filename(filename)
+    file_path = FILES_DIR / _safe_filename(filename)
     
     # Check if file exists and ends with .tar.gz
     if not file_path.exists() or not file_path.name.lower().endswith(".tar.gz"):
         return jsonify({"error": "File not found"}), 404
     
-    return send_file(
-        file_path,
-        mimetype="application/tar+gzip",
-        as_attachment=False,
-        download_name=filename
-    )
+    return _send(file_path, "application/tar+gzip", filename)
 
 @app.route("/zip/<filename>")
 def serve_zip(filename):
     """Serve a zip file by name."""
-    ensure_files_dir()
-    file_path = FILES_DIR / secure_filename(filename)
+    file_path = FILES_DIR / _safe_filename(filename)
     
-    if not file_path.exists() or file_path.suffix.lower() != ".zip":
+    if not file_path.exists() or not file_path.name.lower().endswith(_ZIP_SUFFIX):
         return jsonify({"error": "File not found"}), 404
     
-    return send_file(
-        file_path,
-        mimetype="application/zip",
-        as_attachment=False,
-        download_name=filename
-    )
+    return _send(file_path, "application/zip", filename)
 
 
 @app.route("/latest/zip")
 def serve_latest_zip():
     """Serve the latest zip file."""
-    ensure_files_dir()
-    
-    zip_files = [f for f in FILES_DIR.iterdir() if f.is_file() and f.suffix.lower() == ".zip"]
-    if not zip_files:
+    latest = _get_listing()["latest_zip"]
+    if latest is None:
         return jsonify({"error": "No zip files found"}), 404
     
-    latest = max(zip_files, key=lambda p: p.stat().st_mtime)
-    
-    return send_file(
-        latest,
-        mimetype="application/zip",
-        as_attachment=False,
-        download_name=latest.name
-    )
+    return _send(FILES_DIR / latest, "application/zip", latest)
 
 
 @app.route("/manifest/<filename>")
 def serve_manifest(filename):
     """Serve a manifest file by name."""
-    ensure_files_dir()
-    file_path = FILES_DIR / secure_filename(filename)
+    file_path = FILES_DIR / _safe_filename(filename)
     
-    if not file_path.exists() or file_path.suffix.lower() not in [".json", ".manifest"]:
+    if not file_path.exists() or not file_path.name.lower().endswith(_MANIFEST_SUFFIXES):
         return jsonify({"error": "File not found"}), 404
     
-    return send_file(
-        file_path,
-        mimetype="application/json",
-        as_attachment=False,
-        download_name=filename
-    )
+    return _send(file_path, "application/json", filename)
 
 
 @app.route("/latest/manifest")
 def serve_latest_manifest():
     """Serve the latest manifest file."""
-    ensure_files_dir()
-    
-    manifest_files = [f for f in FILES_DIR.iterdir() if f.is_file() and f.suffix.lower() in [".json", ".manifest"]]
-    if not manifest_files:
+    latest = _get_listing()["latest_manifest"]
+    if latest is None:
         return jsonify({"error": "No manifest files found"}), 404
     
-    latest = max(manifest_files, key=lambda p: p.stat().st_mtime)
-    
-    return send_file(
-        latest,
-        mimetype="application/json",
-        as_attachment=False,
-        download_name=latest.name
-    )
+    return _send(FILES_DIR / latest, "application/json", latest)
 
 
 if __name__ == "__main__":
-    ensure_files_dir()
     port = int(os.getenv("PORT", 5000))
     host = os.getenv("HOST", "0.0.0.0")
     debug = os.getenv("DEBUG", "false").lower() == "true"